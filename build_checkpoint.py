@@ -0,0 +1,126 @@
+"""
+Build checkpoints
+An append-only JSON-lines record of the documents a build has completed:
+topic file, content digest, output hashes, staged files and timings, one
+line flushed after every document. An interrupted build keeps the staged
+outputs of recorded documents, and a resumed build reuses each of them
+only after verifying its hash
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import re
+import time
+
+CHECKPOINT_NAME = ".build_checkpoint.jsonl"
+STAGED_NAME = re.compile(r'(.+)\.\d+\.tmp$')
+
+def file_sha256(path):
+    """SHA-256 of a file's bytes, or None if it does not exist"""
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+class BuildCheckpoint:
+    """Records completed documents; only a build with equal settings can resume from it"""
+    def __init__(self, path, settings):
+        self.path = path
+        self.settings = json.loads(json.dumps(settings))
+        self.file = None
+        # Temporary paths of staged files that belong to recorded documents
+        self.staged = set()
+
+    def read(self):
+        """(header, {filename: record}) of the existing checkpoint"""
+        header, records = {}, {}
+        try:
+            f = open(self.path, encoding='utf-8')
+        except FileNotFoundError:
+            return header, records
+        with f:
+            for number, line in enumerate(f):
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    # The last line may have been cut short by the interruption
+                    break
+                if number == 0:
+                    header = item
+                else:
+                    records[item['file']] = item
+        return header, records
+
+    def verify(self, record):
+        """True if every output of a record is intact, either still staged or already published.
+
+        Outputs published since the record was written are dropped from its staged list."""
+        staged = []
+        for tmp_path, path, digest in record['staged']:
+            if file_sha256(tmp_path) == digest:
+                staged.append([tmp_path, path, digest])
+            elif file_sha256(path) != digest:
+                return False
+        if record['path'] not in {path for _, path, _ in record['staged']} and \
+                file_sha256(record['path']) != record['sha256']:
+            return False
+        record['staged'] = staged
+        return True
+
+    def start(self, digests, resume=False):
+        """Begin a new checkpoint. With resume, returns the previous run's records whose
+        content digest still matches and whose outputs verify; their entries are kept.
+
+        Staged files of previous records that are not reused are deleted, as are staged
+        outputs that workers wrote but never reported."""
+        header, records = self.read()
+        reused = {}
+        if resume and header.get('settings') == self.settings:
+            reused = {filename: record for filename, record in records.items()
+                      if digests.get(filename) == record['digest'] and self.verify(record)}
+        for filename, record in records.items():
+            if filename not in reused:
+                for tmp_path, _, _ in record['staged']:
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(tmp_path)
+        keep = {tmp_path for record in reused.values() for tmp_path, _, _ in record['staged']}
+        directory = os.path.dirname(self.path)
+        for name in os.listdir(directory or '.'):
+            match = STAGED_NAME.match(name)
+            if match and match.group(1) in digests and os.path.join(directory, name) not in keep:
+                os.remove(os.path.join(directory, name))
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'settings': self.settings, 'started': round(time.time(), 3)}, sort_keys=True) + "\n")
+            for record in reused.values():
+                f.write(json.dumps(record, sort_keys=True) + "\n")
+        os.replace(tmp_path, self.path)
+        self.file = open(self.path, 'a', encoding='utf-8')
+        for record in reused.values():
+            self.staged.update(tmp_path for tmp_path, _, _ in record['staged'])
+        return reused
+
+    def record(self, filename, digest, path, entry, staged, event):
+        """Append one completed document: its manifest entry, (temporary path, final path, sha256)
+        of every staged output, and its render time"""
+        record = {'file': filename, 'digest': digest, 'path': path, 'sha256': entry['sha256'],
+                  'pages': entry['pages'], 'seconds': event['seconds'], 'entry': entry,
+                  'staged': [list(item) for item in staged]}
+        self.file.write(json.dumps(record, sort_keys=True) + "\n")
+        self.file.flush()
+        self.staged.update(tmp_path for tmp_path, _, _ in staged)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def finish(self):
+        """The batch is published: the checkpoint is no longer needed"""
+        self.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.path)
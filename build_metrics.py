@@ -0,0 +1,150 @@
+"""
+Build metrics
+Counters and a render-duration histogram for catalog builds, exported in the
+Prometheus text format (a file for batch runs, an HTTP endpoint in server
+mode), plus one JSON log line per event. Recording is a few integer
+additions per document
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRIC_PREFIX = "aws_pdf"
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RESULTS = ('rendered', 'skipped', 'resumed', 'failed')
+# Loopback only by default; pass a host (e.g. 0.0.0.0) to expose /metrics
+METRICS_HOST = '127.0.0.1'
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout"""
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, help_text):
+        yield f"# HELP {name} {help_text}"
+        yield f"# TYPE {name} histogram"
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield f'{name}_bucket{{le="{bound}"}} {total}'
+        yield f'{name}_bucket{{le="+Inf"}} {self.count}'
+        yield f"{name}_sum {self.sum:.6f}"
+        yield f"{name}_count {self.count}"
+
+class BuildMetrics:
+    """Aggregated metrics of one build process, with an optional JSON event log"""
+    def __init__(self, log=None):
+        self.log = log
+        self.documents = dict.fromkeys(RESULTS, 0)
+        self.render_seconds = Histogram()
+        self.pages = 0
+        self.output_bytes = 0
+        self.bytes_written = 0
+        self.layout_cache = {'hit': 0, 'miss': 0}
+        self.markup_cache = {'hit': 0, 'miss': 0}
+        self.build_failures = 0
+        self.started = time.time()
+        self.finished = None
+        self.lock = threading.Lock()
+
+    def observe(self, event):
+        """Record one document event (as produced by PDFGenerator.build_document)"""
+        with self.lock:
+            self.documents[event['result']] += 1
+            if event['result'] in ('rendered', 'skipped'):
+                self.render_seconds.observe(event['seconds'])
+                self.pages += event['pages']
+                self.output_bytes += event['bytes']
+                if event['result'] == 'rendered':
+                    self.bytes_written += event['bytes']
+                self.layout_cache['hit'] += event['layout_hits']
+                self.layout_cache['miss'] += event['layout_misses']
+                self.markup_cache['hit'] += event['markup_hits']
+                self.markup_cache['miss'] += event['markup_misses']
+        self.write_log(event)
+
+    def build_failed(self, error):
+        """Record a failure of the whole build (a crash or an interrupt), as opposed to one document"""
+        with self.lock:
+            self.build_failures += 1
+        self.write_log({'event': 'build_failed', 'error': error})
+
+    def write_log(self, event):
+        if self.log is not None:
+            self.log.write(json.dumps({'ts': round(time.time(), 3), **event}, sort_keys=True) + "\n")
+            self.log.flush()
+
+    def finish(self):
+        self.finished = time.time()
+        self.write_log({'event': 'build', 'seconds': round(self.finished - self.started, 3),
+                        'documents': self.documents, 'pages': self.pages,
+                        'bytes_written': self.bytes_written})
+
+    def prometheus_text(self):
+        """Current metrics in the Prometheus text exposition format"""
+        p = METRIC_PREFIX
+        with self.lock:
+            lines = [f"# HELP {p}_documents_total Documents by result (skipped: output unchanged, not rewritten; "
+                     "resumed: reused from an interrupted build's checkpoint)",
+                     f"# TYPE {p}_documents_total counter"]
+            lines += [f'{p}_documents_total{{result="{result}"}} {count}' for result, count in self.documents.items()]
+            lines += self.render_seconds.lines(f"{p}_render_duration_seconds", "Render time per document")
+            for name, value, help_text in (
+                    ('pages_total', self.pages, "Pages rendered"),
+                    ('output_bytes_total', self.output_bytes, "Bytes of rendered PDFs"),
+                    ('bytes_written_total', self.bytes_written, "Bytes written to disk for changed PDFs"),
+                    ('build_failures_total', self.build_failures, "Builds aborted before publishing (crash, interrupt or failed publish)")):
+                lines += [f"# HELP {p}_{name} {help_text}", f"# TYPE {p}_{name} counter", f"{p}_{name} {value}"]
+            for name, counts, help_text in (
+                    ('layout_cache_lookups_total', self.layout_cache, "Paragraph layout cache lookups"),
+                    ('markup_cache_lookups_total', self.markup_cache, "Parsed markup reused from validation")):
+                lines += [f"# HELP {p}_{name} {help_text}", f"# TYPE {p}_{name} counter"]
+                lines += [f'{p}_{name}{{result="{result}"}} {count}' for result, count in counts.items()]
+            lines += [f"# HELP {p}_build_start_timestamp_seconds Start of the build",
+                      f"# TYPE {p}_build_start_timestamp_seconds gauge",
+                      f"{p}_build_start_timestamp_seconds {self.started:.3f}"]
+            if self.finished is not None:
+                lines += [f"# HELP {p}_build_duration_seconds Wall time of the last finished build",
+                          f"# TYPE {p}_build_duration_seconds gauge",
+                          f"{p}_build_duration_seconds {self.finished - self.started:.3f}"]
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path):
+        """Atomically write the text format, e.g. for the node exporter textfile collector"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+def serve(metrics, port, host=METRICS_HOST):
+    """Serve /metrics from a background thread; returns the server"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,174 @@
+"""
+Duplicate Content Finder
+Fingerprints every paragraph and bullet in the topic catalog and reports
+exact duplicates (same normalized text) and near-duplicates (MinHash over
+character shingles, candidates found with locality-sensitive hashing), so
+the work stays roughly linear in the size of the catalog
+"""
+
+import argparse
+import json
+import re
+import time
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from generate_aws_pdfs import AWS_TOPICS, TAG
+from synthetic_catalog import CatalogGenerator
+
+SHINGLE_SIZE = 5
+NUM_HASHES = 64
+BANDS = 16
+MERSENNE_PRIME = (1 << 61) - 1
+NEAR_THRESHOLD = 0.6
+
+WORD = re.compile(r"[a-z0-9@/.+-]+")
+
+def content_units(topics=AWS_TOPICS):
+    """(location, text) for every text, bullet and box paragraph in the catalog"""
+    for filename, _, sections in topics:
+        for i, section in enumerate(sections, 1):
+            if 'text' in section:
+                yield (filename, i, 'text'), section['text']
+            for j, bullet in enumerate(section.get('bullets', []), 1):
+                yield (filename, i, f"bullet {j}"), bullet
+            if 'box' in section:
+                yield (filename, i, 'box'), section['box']
+
+def format_location(location):
+    filename, section, field = location
+    return f"{filename} section {section} {field}"
+
+def normalize(text):
+    """Lowercase words with markup and punctuation removed"""
+    return " ".join(WORD.findall(TAG.sub(' ', text).replace('&amp;', '&').lower()))
+
+def shingles(text):
+    """Character shingles of normalized text, hashed to 32 bits"""
+    if len(text) <= SHINGLE_SIZE:
+        return {zlib.crc32(text.encode())}
+    return {zlib.crc32(text[i:i + SHINGLE_SIZE].encode()) for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+class MinHasher:
+    """MinHash signatures from a fixed family of universal hash functions"""
+    def __init__(self, num_hashes=NUM_HASHES, seed=1):
+        rng = np.random.default_rng(seed)
+        # a * h fits in 64 bits for 32-bit shingle hashes and a < 2**31
+        self.a = rng.integers(1, 1 << 31, num_hashes, dtype=np.uint64)[:, None]
+        self.b = rng.integers(0, 1 << 31, num_hashes, dtype=np.uint64)[:, None]
+
+    def signature(self, hashes):
+        values = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+        return ((self.a * values + self.b) % np.uint64(MERSENNE_PRIME)).min(axis=1)
+
+def find_duplicates(topics=AWS_TOPICS, threshold=NEAR_THRESHOLD):
+    """Returns (exact groups, near groups).
+
+    exact: lists of locations sharing one normalized text.
+    near: lists of (similarity to the group's first location, location) for
+    different texts at or above threshold."""
+    by_text = defaultdict(list)
+    for location, text in content_units(topics):
+        normalized = normalize(text)
+        if normalized:
+            by_text[normalized].append(location)
+    exact = [locations for locations in by_text.values() if len(locations) > 1]
+
+    # Near duplicates among distinct texts: identical signature bands become candidate pairs
+    texts = list(by_text)
+    shingle_sets = [shingles(text) for text in texts]
+    hasher = MinHasher()
+    rows = NUM_HASHES // BANDS
+    buckets = defaultdict(list)
+    for index, shingle_set in enumerate(shingle_sets):
+        signature = hasher.signature(shingle_set)
+        for band in range(BANDS):
+            buckets[(band, signature[band * rows:(band + 1) * rows].tobytes())].append(index)
+
+    # Each bucket is compared against its first member only, so work stays linear in bucket size;
+    # the other bands give similar texts further chances to meet
+    parent = list(range(len(texts)))
+    def root(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+    for members in buckets.values():
+        first = members[0]
+        for other in members[1:]:
+            if root(first) == root(other):
+                continue
+            score = jaccard(shingle_sets[first], shingle_sets[other])
+            if score >= threshold:
+                parent[root(other)] = root(first)
+
+    clusters = defaultdict(list)
+    for index in range(len(texts)):
+        clusters[root(index)].append(index)
+    near = []
+    for members in clusters.values():
+        if len(members) > 1:
+            head = min(members, key=lambda index: by_text[texts[index]][0])
+            near.append(sorted(
+                ((1.0 if index == head else jaccard(shingle_sets[head], shingle_sets[index]),
+                  by_text[texts[index]][0]) for index in members),
+                key=lambda item: (-item[0], item[1])))
+    near.sort(key=lambda group: group[0][1])
+    return exact, near
+
+def jaccard(first, second):
+    return len(first & second) / len(first | second)
+
+def print_report(exact, near, units):
+    """Human-readable duplicate report"""
+    repeated = sum(len(locations) - 1 for locations in exact)
+    print(f"Scanned {units:,} paragraphs and bullets")
+    print(f"\nExact duplicates: {len(exact)} texts, {repeated} redundant copies")
+    for locations in sorted(exact, key=lambda group: (-len(group), group)):
+        print(f"  {len(locations)}x")
+        for location in locations:
+            print(f"    {format_location(location)}")
+    print(f"\nNear duplicates: {len(near)} groups")
+    for group in near:
+        print(f"  {len(group)} similar texts")
+        for similarity, location in group:
+            print(f"    {similarity:4.0%}  {format_location(location)}")
+
+def benchmark_duplicates(sizes=(16, 160, 1600)):
+    """Time the analysis on synthetic catalogs of growing size"""
+    generator = CatalogGenerator()
+    for topics in sizes:
+        catalog = generator.catalog(topics)
+        units = sum(1 for _ in content_units(catalog))
+        start = time.perf_counter()
+        exact, near = find_duplicates(catalog)
+        elapsed = time.perf_counter() - start
+        print(f"{topics:6,} topics, {units:8,} paragraphs: {elapsed:6.2f}s "
+              f"({units / elapsed:,.0f} paragraphs/sec, {len(exact):,} exact groups, {len(near):,} near groups)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report duplicate and near-duplicate catalog content")
+    parser.add_argument('--threshold', type=float, default=NEAR_THRESHOLD,
+                        help="Minimum shingle (Jaccard) similarity for near duplicates")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    parser.add_argument('--benchmark', action='store_true', help="Time the analysis on scaled-up catalogs and exit")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        benchmark_duplicates()
+        return
+    exact, near = find_duplicates(threshold=args.threshold)
+    if args.json:
+        print(json.dumps({
+            'exact': [[format_location(location) for location in group] for group in exact],
+            'near': [[{'location': format_location(location), 'similarity': round(similarity, 3)}
+                      for similarity, location in group] for group in near],
+        }, indent=2))
+    else:
+        print_report(exact, near, sum(1 for _ in content_units()))
+    return exact, near
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+AWS Flashcards
+Spaced-repetition study mode built from the '<b>Term:</b> definition' bullets.
+Scheduling state lives in one memory-mapped file, one column per field and
+one row per learner, so due-card selection and grading are vectorized
+array operations instead of loops over card objects. Cards are identified
+by 'topic|term', so editing the guides keeps the progress on unchanged cards
+"""
+
+import argparse
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+from generate_aws_pdfs import AWS_TOPICS, TAG, term_bullets, topic_name
+
+DECK_FILE = "flashcards.deck"
+DECK_MAGIC = b'AWSCARD2'
+# Magic, learners, cards, size of the card id block that follows the header
+HEADER = struct.Struct('<8sIII')
+HEADER_SIZE = 64
+
+# Column name, dtype. Ease is stored in thousandths (2500 = 2.5), intervals and due dates in days
+COLUMNS = (
+    ('due', np.int32),
+    ('interval', np.uint16),
+    ('ease', np.uint16),
+    ('reps', np.uint8),
+    ('lapses', np.uint8),
+)
+INITIAL_EASE = 2500
+MIN_EASE = 1300
+MAX_INTERVAL = 36500
+GRADES = ('0', '1', '2', '3', '4', '5')
+
+def build_cards(topics=AWS_TOPICS):
+    """(topic, term, definition) for every term bullet in the catalog"""
+    return [(topic_name(title), term, TAG.sub('', definition))
+            for _, title, sections in topics for section in sections
+            for term, definition in term_bullets(section)]
+
+def card_ids(cards):
+    """Stable 'topic|term' id of every card; a term repeated within a topic gets a '|2', '|3'... suffix"""
+    ids, seen = [], {}
+    for topic, term, _ in cards:
+        card_id = f"{topic}|{term}"
+        seen[card_id] = seen.get(card_id, 0) + 1
+        ids.append(card_id if seen[card_id] == 1 else f"{card_id}|{seen[card_id]}")
+    return ids
+
+def padded(size):
+    """Size rounded up to 8 bytes, so every column starts aligned"""
+    return (size + 7) // 8 * 8
+
+def today():
+    """Current day number (days since the Unix epoch)"""
+    return int(time.time() // 86400)
+
+class FlashcardDeck:
+    """Scheduling state of every (learner, card) pair in a memory-mapped columnar file.
+
+    A deck created for a different card list is rewritten for the current one: cards are
+    matched by id, new cards start unseen and removed cards are dropped."""
+    def __init__(self, path, cards, learners=None):
+        self.path = path
+        self.ids = card_ids(cards)
+        self.cards = len(self.ids)
+        # (kept, added, removed) card counts if the deck had to be remapped
+        self.changes = None
+        if learners is not None:
+            self.learners = learners
+            self._create(path)
+            self._open()
+            self.ease[:] = INITIAL_EASE
+            self.ease.flush()
+            return
+        with open(path, 'rb') as f:
+            magic, self.learners, count, ids_size = HEADER.unpack(f.read(HEADER.size))
+            if magic != DECK_MAGIC:
+                raise ValueError(f"{path} is not a flashcard deck (or an older format; rebuild it with --learners)")
+            f.seek(HEADER_SIZE)
+            stored_ids = f.read(ids_size).decode('utf-8').split("\n") if count else []
+        if stored_ids != self.ids:
+            self._remap(stored_ids)
+        self._open()
+
+    def _columns(self, path, ids, mode='r+'):
+        """Memory-mapped columns of a deck file for the given card ids, by name"""
+        offset = HEADER_SIZE + padded(len("\n".join(ids).encode('utf-8')))
+        columns = {}
+        for name, dtype in COLUMNS:
+            columns[name] = np.memmap(path, dtype=dtype, mode=mode, offset=offset, shape=(self.learners, len(ids)))
+            offset += padded(self.learners * len(ids) * np.dtype(dtype).itemsize)
+        return columns
+
+    def _open(self):
+        for name, column in self._columns(self.path, self.ids).items():
+            setattr(self, name, column)
+
+    def _create(self, path):
+        ids = "\n".join(self.ids).encode('utf-8')
+        size = HEADER_SIZE + padded(len(ids)) + sum(padded(self.learners * self.cards * np.dtype(dtype).itemsize)
+                                                    for _, dtype in COLUMNS)
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(DECK_MAGIC, self.learners, self.cards, len(ids)).ljust(HEADER_SIZE, b'\0'))
+            f.write(ids)
+            f.truncate(size)
+
+    def _remap(self, stored_ids):
+        """Rewrite the deck for the current card list, keeping the state of every card whose id still exists"""
+        index = {card_id: i for i, card_id in enumerate(stored_ids)}
+        new = np.array([i for i, card_id in enumerate(self.ids) if card_id in index], dtype=np.intp)
+        old = np.array([index[self.ids[i]] for i in new], dtype=np.intp)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        self._create(tmp_path)
+        source = self._columns(self.path, stored_ids, mode='r')
+        target = self._columns(tmp_path, self.ids)
+        target['ease'][:] = INITIAL_EASE
+        for name, column in target.items():
+            column[:, new] = source[name][:, old]
+            column.flush()
+        del source, target
+        os.replace(tmp_path, self.path)
+        self.changes = (len(new), self.cards - len(new), len(stored_ids) - len(new))
+
+    def due_cards(self, learner, day, limit=20, new_limit=5):
+        """Card indices to study: overdue reviews first (most overdue first), then unseen cards"""
+        due = self.due[learner]
+        seen = self.interval[learner] > 0
+        reviews = np.flatnonzero(seen & (due <= day))
+        if len(reviews) > limit:
+            reviews = reviews[np.argpartition(due[reviews], limit)[:limit]]
+        reviews = reviews[np.lexsort((reviews, due[reviews]))]
+        new = np.flatnonzero(~seen)[:max(0, min(new_limit, limit - len(reviews)))]
+        return np.concatenate([reviews, new])
+
+    def due_counts(self, day):
+        """Number of reviews due per learner"""
+        return np.count_nonzero((self.interval > 0) & (self.due <= day), axis=1)
+
+    def review(self, learners, cards, grades, day):
+        """Apply SM-2 grades (0-5) to (learner, card) pairs; array arguments broadcast"""
+        learners, cards, grades = np.broadcast_arrays(learners, cards, np.asarray(grades, dtype=np.int32))
+        if grades.size and (grades.min() < 0 or grades.max() > 5):
+            raise ValueError("grades must be between 0 and 5")
+        ease = self.ease[learners, cards].astype(np.int32)
+        interval = self.interval[learners, cards].astype(np.int64)
+        reps = self.reps[learners, cards].astype(np.int32)
+        passed = grades >= 3
+
+        miss = 5 - grades
+        ease = np.maximum(MIN_EASE, ease + 100 - miss * (80 + miss * 20))
+        reps = np.where(passed, np.minimum(reps + 1, 255), 0)
+        interval = np.where(reps <= 1, 1, np.where(reps == 2, 6, (interval * ease + 500) // 1000))
+        interval = np.clip(interval, 1, MAX_INTERVAL)
+
+        self.ease[learners, cards] = ease
+        self.reps[learners, cards] = reps
+        self.interval[learners, cards] = interval
+        self.due[learners, cards] = day + interval
+        lapses = self.lapses[learners, cards].astype(np.int32)
+        self.lapses[learners, cards] = np.where(passed, lapses, np.minimum(lapses + 1, 255))
+
+    def flush(self):
+        for name, _ in COLUMNS:
+            getattr(self, name).flush()
+
+def study(deck, cards, learner, day, limit=20):
+    """Interactive terminal session for one learner"""
+    queue = deck.due_cards(learner, day, limit)
+    if not len(queue):
+        print("Nothing due today.")
+        return
+    for number, card in enumerate(queue, 1):
+        topic, term, definition = cards[card]
+        print(f"\n[{number}/{len(queue)}] {topic}\n  {term}")
+        input("  (Enter to reveal) ")
+        print(f"  {definition}")
+        grade = input("  Grade 0-5 (0 = blank, 3 = hard, 5 = easy): ").strip()
+        while grade not in GRADES:
+            grade = input("  Enter a grade from 0 to 5: ").strip()
+        deck.review(learner, card, int(grade), day)
+    deck.flush()
+    print(f"\n✓ Reviewed {len(queue)} cards")
+
+def benchmark_flashcards(learners=2000, days=30, reviews_per_day=20):
+    """Selection and update throughput over a simulated month of study"""
+    cards = build_cards()
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        deck = FlashcardDeck(os.path.join(tmp, DECK_FILE), cards, learners)
+        start_day = today()
+        select_time = update_time = count_time = 0.0
+        selections = updates = 0
+        for day in range(start_day, start_day + days):
+            start = time.perf_counter()
+            deck.due_counts(day)
+            count_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            queues = [deck.due_cards(learner, day, reviews_per_day) for learner in range(learners)]
+            select_time += time.perf_counter() - start
+            selections += learners
+
+            rows = np.repeat(np.arange(learners), [len(queue) for queue in queues])
+            columns = np.concatenate(queues)
+            grades = rng.integers(1, 6, len(columns))
+            start = time.perf_counter()
+            deck.review(rows, columns, grades, day)
+            update_time += time.perf_counter() - start
+            updates += len(columns)
+        deck.flush()
+        states = learners * len(cards)
+        file_size = os.path.getsize(deck.path)
+
+    print(f"Deck: {learners:,} learners x {len(cards)} cards = {states:,} card states "
+          f"({file_size / states:.1f} bytes each, {file_size / 1024 / 1024:.1f} MB)")
+    print(f"Due counts, all learners:  {states * days / count_time:,.0f} card states/sec")
+    print(f"Next-due selection:        {selections / select_time:,.0f} learners/sec "
+          f"({states * days / select_time:,.0f} card states/sec)")
+    print(f"Batched review updates:    {updates / update_time:,.0f} reviews/sec")
+    return selections / select_time, updates / update_time
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Spaced-repetition flashcards for the AWS topics")
+    parser.add_argument('--deck', default=DECK_FILE, help="Memory-mapped scheduling state")
+    parser.add_argument('--learners', type=int, default=None, help="Create (or recreate) the deck for N learners")
+    parser.add_argument('--learner', type=int, default=0, help="Learner to study as")
+    parser.add_argument('--limit', type=int, default=20, help="Cards per session")
+    parser.add_argument('--due', action='store_true', help="Print the number of due reviews per learner and exit")
+    parser.add_argument('--benchmark', action='store_true', help="Benchmark selection and update throughput and exit")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        benchmark_flashcards()
+        return
+
+    cards = build_cards()
+    learners = args.learners
+    if learners is None and not os.path.exists(args.deck):
+        learners = 1
+    deck = FlashcardDeck(args.deck, cards, learners)
+    if deck.changes is not None:
+        kept, added, removed = deck.changes
+        print(f"↻ Card list changed: progress kept on {kept} cards, {added} new, {removed} removed")
+    if args.due:
+        for learner, count in enumerate(deck.due_counts(today())):
+            print(f"Learner {learner}: {count} due")
+        return deck
+    if not 0 <= args.learner < deck.learners:
+        raise SystemExit(f"Learner {args.learner} not in deck (0-{deck.learners - 1})")
+    study(deck, cards, args.learner, today(), args.limit)
+    return deck
+
+if __name__ == "__main__":
+    main()
@@ -6,12 +6,39 @@ Creates beautifully designed PDF files for LinkedIn posting
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle, Image
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle, Image, Flowable, KeepTogether
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 from reportlab.pdfgen import canvas
 from reportlab.lib.colors import HexColor
+from reportlab.lib.utils import TimeStamp
+from reportlab.lib.fonts import addMapping
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus.paraparser import known_entities
+from reportlab import rl_config
+import argparse
+import contextlib
+import csv
+import ctypes
+import hashlib
+import io
+import json
 import os
+import pickle
+import re
+import sys
+import tempfile
+import time
+
+import build_checkpoint
+import build_metrics
+import pdf_linearize
+import pdf_objects
+import pdf_snapshot
+import pdf_stamp
+import render_pool
+import topic_links
 
 # AWS Brand Colors
 AWS_ORANGE = HexColor('#FF9900')
@@ -19,15 +46,368 @@ AWS_DARK = HexColor('#232F3E')
 AWS_LIGHT_GRAY = HexColor('#F4F4F4')
 AWS_BLUE = HexColor('#146EB4')
 
+# Page chrome text
+FOOTER_TEXT = "AWS Certification Study Material | LinkedIn Post"
+AUTHOR_TEXT = "Kahaf Sameer - DevOps Engineer"
+
+# Layout cache defaults
+LAYOUT_CACHE_DIR = ".pdf_cache"
+LAYOUT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+LAYOUT_CACHE_MAX_AGE = 30 * 24 * 3600
+
+# Content-addressed output defaults
+CONTENT_STORE_DIR = ".pdf_store"
+MANIFEST_NAME = "manifest.json"
+
+# Output size settings
+PAGE_COMPRESSION_MODES = ('ascii85', 'flate', 'none')
+FONT_MODES = ('standard', 'embedded')
+
+# Page geometry: letter pages with 1in margins
+FRAME_WIDTH = letter[0] - 2*inch
+FRAME_BOTTOM, FRAME_TOP = 1*inch, letter[1] - 1*inch
+
+# Combined bundle of every topic
+COMPENDIUM_FILE = "00_AWS_Compendium.pdf"
+COMPENDIUM_TITLE = "AWS Certification Study Compendium"
+
+# Content schema: keys a section may use; '&' must start a known entity
+SECTION_KEYS = ('subtitle', 'text', 'bullets', 'box')
+AMPERSAND = re.compile(r'&(#\d+;|#x[0-9A-Fa-f]+;|([A-Za-z][A-Za-z0-9]*);)?')
+TAG = re.compile(r'<[^>]+>')
+TERM_BULLET = re.compile(r'^<b>(?P<term>[^<]+?):</b>\s*(?P<definition>.+)$')
+
+# TrueType faces shipped with ReportLab, embedded (subset) in 'embedded' font mode
+EMBEDDED_FONT_FAMILY = 'AWSSans'
+EMBEDDED_FONT_FILES = {
+    'AWSSans': 'Vera.ttf',
+    'AWSSans-Bold': 'VeraBd.ttf',
+    'AWSSans-Oblique': 'VeraIt.ttf',
+    'AWSSans-BoldOblique': 'VeraBI.ttf',
+}
+
+def style_signature(style):
+    """Stable description of a paragraph style, used in cache keys"""
+    return sorted((key, repr(value)) for key, value in style.__dict__.items()
+                  if key != 'parent')
+
+class SectionLayout:
+    """Parsed fragments and wrapped lines for the paragraphs of one section"""
+    def __init__(self, entries=None):
+        self.entries = entries if entries is not None else {}
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+    
+    def put(self, key, value):
+        self.entries[key] = value
+        self.dirty = True
+
+class FragmentCache:
+    """On-disk cache of per-section layout results, reused across runs"""
+    def __init__(self, cache_dir=LAYOUT_CACHE_DIR, max_bytes=LAYOUT_CACHE_MAX_BYTES,
+                 max_age=LAYOUT_CACHE_MAX_AGE):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+    
+    def section_key(self, section, styles, frame_width):
+        """Hash of the section content, the styles it uses and the frame width"""
+        payload = json.dumps({
+            'section': section,
+            'styles': [(style.name, style_signature(style)) for style in styles],
+            'width': round(frame_width, 3),
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.pkl')
+    
+    def load(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entries = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return SectionLayout()
+        # Refresh the timestamp so recently used sections survive eviction
+        os.utime(path)
+        return SectionLayout(entries)
+    
+    def store(self, key, layout):
+        if not layout.dirty:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            data = pickle.dumps(layout.entries, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # Some flowable fragments (e.g. inline images) cannot be pickled
+            return
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        layout.dirty = False
+    
+    def evict(self):
+        """Drop entries older than max_age, then the least recently used until under max_bytes"""
+        now = time.time()
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if now - st.st_mtime > self.max_age:
+                    # Another build may be evicting the same cache
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(path)
+                else:
+                    files.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+def fixed_timestamp(epoch):
+    """ReportLab timestamp pinned to the given UNIX time (UTC)"""
+    stamp = TimeStamp(invariant=1)
+    stamp.t = epoch
+    stamp.lt = time.gmtime(epoch)
+    stamp.YMDhms = tuple(stamp.lt)[:6]
+    return stamp
+
+def source_date_epoch(default=None):
+    """Build timestamp from SOURCE_DATE_EPOCH, as used by reproducible-builds tooling"""
+    value = os.environ.get('SOURCE_DATE_EPOCH', '').strip()
+    return int(value) if value else default
+
+class ContentStore:
+    """Stores PDFs by the SHA-256 of their bytes so identical documents are kept once"""
+    def __init__(self, store_dir=CONTENT_STORE_DIR):
+        self.store_dir = store_dir
+        if not os.path.exists(store_dir):
+            os.makedirs(store_dir)
+    
+    def path(self, digest):
+        return os.path.join(self.store_dir, digest[:2], digest + '.pdf')
+    
+    def put(self, data):
+        """Store the bytes; returns (digest, True if they were already present)"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest, True
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return digest, False
+
+def libc_syncfs():
+    """syncfs(2) on Linux: flushes one filesystem instead of every filesystem on the host"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        return ctypes.CDLL(None, use_errno=True).syncfs
+    except (OSError, AttributeError):
+        return None
+
+SYNCFS = libc_syncfs()
+
+def sync_files(paths):
+    """Flush written files to disk: one syncfs per filesystem they are on where available,
+    rather than an fsync per file"""
+    if SYNCFS is None:
+        for path in paths:
+            with open(path, 'rb+') as f:
+                os.fsync(f.fileno())
+        return
+    filesystems = {}
+    for path in paths:
+        filesystems.setdefault(os.stat(path).st_dev, path)
+    for path in filesystems.values():
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            if SYNCFS(fd) != 0:
+                error = ctypes.get_errno()
+                raise OSError(error, os.strerror(error), path)
+        finally:
+            os.close(fd)
+
+def sync_directories(directories):
+    """Persist renames by syncing the directories that contain them (POSIX only)"""
+    if os.name != 'posix':
+        return
+    for directory in directories:
+        fd = os.open(directory or '.', os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+def register_embedded_fonts():
+    """Register the embeddable TrueType family once per process"""
+    if EMBEDDED_FONT_FAMILY in pdfmetrics.getRegisteredFontNames():
+        return
+    for name, path in EMBEDDED_FONT_FILES.items():
+        pdfmetrics.registerFont(TTFont(name, path))
+    # Map <b>/<i> markup onto the embedded faces
+    addMapping(EMBEDDED_FONT_FAMILY, 0, 0, 'AWSSans')
+    addMapping(EMBEDDED_FONT_FAMILY, 1, 0, 'AWSSans-Bold')
+    addMapping(EMBEDDED_FONT_FAMILY, 0, 1, 'AWSSans-Oblique')
+    addMapping(EMBEDDED_FONT_FAMILY, 1, 1, 'AWSSans-BoldOblique')
+
+@contextlib.contextmanager
+def rl_settings(**settings):
+    """Temporarily override ReportLab rl_config values"""
+    saved = {key: getattr(rl_config, key) for key in settings}
+    for key, value in settings.items():
+        setattr(rl_config, key, value)
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            setattr(rl_config, key, value)
+
+class CachedParagraph(Paragraph):
+    """Paragraph that takes its parsed fragments and line breaks from a SectionLayout"""
+    def __init__(self, text, style=None, bulletText=None, frags=None, caseSensitive=1,
+                 encoding='utf8', layout=None, slot=None):
+        # Split halves are created without a layout and behave like plain paragraphs
+        self._layout = layout
+        self._slot = slot
+        if layout is not None and frags is None:
+            frags = layout.get((slot, 'frags'))
+            if frags is None:
+                Paragraph.__init__(self, text, style, bulletText, None, caseSensitive, encoding)
+                layout.put((slot, 'frags'), self.frags)
+                return
+        Paragraph.__init__(self, text, style, bulletText, frags, caseSensitive, encoding)
+    
+    def wrap(self, availWidth, availHeight):
+        if self._layout is None:
+            return Paragraph.wrap(self, availWidth, availHeight)
+        key = (self._slot, 'wrap', round(availWidth, 3))
+        cached = self._layout.get(key)
+        if cached is not None:
+            self.width, self._wrapWidths, self.blPara, self.height = cached
+            return self.width, self.height
+        Paragraph.wrap(self, availWidth, availHeight)
+        self._layout.put(key, (self.width, self._wrapWidths, self.blPara, self.height))
+        return self.width, self.height
+
+def topic_anchor(filename):
+    """Named destination of a topic inside the compendium"""
+    return "topic-" + os.path.splitext(filename)[0]
+
+class TopicMarker(Flowable):
+    """Zero-size flowable marking the start of a topic: named destination and outline entry"""
+    def __init__(self, key, title):
+        Flowable.__init__(self)
+        self.key = key
+        self.title = title
+    
+    def wrap(self, availWidth, availHeight):
+        return 0, 0
+    
+    def draw(self):
+        self.canv.bookmarkPage(self.key)
+        self.canv.addOutlineEntry(self.title, self.key, level=0)
+        self.canv.showOutline()
+
+def staging_errors(staged):
+    """Problems that would stop a staged batch from publishing in one step"""
+    errors = []
+    destinations, temporary = set(), set()
+    for tmp_path, path, _ in staged:
+        if path in destinations:
+            errors.append(f"{path} is staged twice")
+        if tmp_path in temporary:
+            errors.append(f"{tmp_path} is staged for two outputs")
+        elif not os.path.exists(tmp_path):
+            errors.append(f"staged file {tmp_path} is missing")
+        destinations.add(path)
+        temporary.add(tmp_path)
+    return errors
+
 class PDFGenerator:
-    def __init__(self, output_dir="AWS_PDFs"):
+    def __init__(self, output_dir="AWS_PDFs", cache_dir=LAYOUT_CACHE_DIR, reproducible=False,
+                 timestamp=None, store_dir=None, draft=False, page_compression='ascii85',
+                 fonts='standard', dedupe_streams=False, size_budget=None, linearize=False,
+                 footer_text=FOOTER_TEXT, author_text=AUTHOR_TEXT, recipients=None,
+                 copies_dir=None, batch=False):
         self.output_dir = output_dir
+        self.draft = draft
+        self.footer_text = footer_text
+        self.author_text = author_text
+        self.styles = None
+        # Draw the page chrome once as a form XObject (compendium builds)
+        self.chrome_form = False
+        # Inline markup parsed by validate(), keyed by (style name, text)
+        self.parsed = {}
+        self.markup_hits = self.markup_misses = 0
+        self.metrics = build_metrics.BuildMetrics()
+        self.last_event = None
+        # Batch mode: outputs are written under temporary names and renamed into place by publish()
+        self.batch = batch
+        self.staged = []
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
+        self.fragment_cache = FragmentCache(cache_dir) if cache_dir else None
+        
+        # Output size: stream encoding, font embedding, stream deduplication and budget (bytes)
+        if page_compression not in PAGE_COMPRESSION_MODES:
+            raise ValueError(f"page_compression must be one of {PAGE_COMPRESSION_MODES}")
+        if fonts not in FONT_MODES:
+            raise ValueError(f"fonts must be one of {FONT_MODES}")
+        self.page_compression = 'none' if draft else page_compression
+        self.fonts = fonts
+        self.dedupe_streams = dedupe_streams
+        self.size_budget = size_budget
+        self.linearize = linearize
+        
+        # Personalised copies: each topic is rendered once, then stamped per recipient
+        self.recipients = recipients or []
+        self.copies_dir = copies_dir or os.path.join(output_dir, "copies")
+        if fonts == 'embedded':
+            register_embedded_fonts()
+            self.font_regular, self.font_bold = 'AWSSans', 'AWSSans-Bold'
+        else:
+            self.font_regular, self.font_bold = 'Helvetica', 'Helvetica-Bold'
+        
+        # Reproducible mode: fixed timestamp, content-derived ID, content-addressed outputs
+        self.reproducible = reproducible
+        self.timestamp = timestamp if timestamp is not None else source_date_epoch()
+        self.content_store = ContentStore(store_dir) if store_dir else None
+        self.manifest = {}
+        self.previous_manifest = self.load_manifest()
         
     def create_custom_styles(self):
         """Create custom paragraph styles for professional look"""
         styles = getSampleStyleSheet()
+        # Draft mode skips justification; line breaks and pagination are unchanged
+        body_alignment = TA_LEFT if self.draft else TA_JUSTIFY
         
         # Title style
         styles.add(ParagraphStyle(
@@ -37,7 +417,7 @@ class PDFGenerator:
             textColor=AWS_DARK,
             spaceAfter=30,
             alignment=TA_CENTER,
-            fontName='Helvetica-Bold'
+            fontName=self.font_bold
         ))
         
         # Subtitle style
@@ -48,7 +428,7 @@ class PDFGenerator:
             textColor=AWS_ORANGE,
             spaceAfter=12,
             spaceBefore=12,
-            fontName='Helvetica-Bold'
+            fontName=self.font_bold
         ))
         
         # Body style
@@ -58,8 +438,9 @@ class PDFGenerator:
             fontSize=11,
             textColor=AWS_DARK,
             spaceAfter=12,
-            alignment=TA_JUSTIFY,
-            leading=16
+            alignment=body_alignment,
+            leading=16,
+            fontName=self.font_regular
         ))
         
         # Bullet style
@@ -71,51 +452,331 @@ class PDFGenerator:
             leftIndent=20,
             spaceAfter=8,
             bulletIndent=10,
-            leading=14
+            leading=14,
+            fontName=self.font_regular
+        ))
+        
+        # Draft box: a bordered paragraph instead of a one-cell table, indented so the text
+        # wraps at the same width as the table cell: the 6in table is centred in the frame
+        # (less its 6pt padding each side) and pads its text by 12pt on each side
+        box_indent = (FRAME_WIDTH - 12 - 6*inch) / 2 + 12
+        styles.add(ParagraphStyle(
+            name='DraftBox',
+            parent=styles['CustomBody'],
+            leftIndent=box_indent,
+            rightIndent=box_indent,
+            spaceBefore=12,
+            spaceAfter=12,
+            borderWidth=1,
+            borderColor=AWS_BLUE,
+            borderPadding=12
         ))
         
         return styles
     
+    def add_draft_page_number(self, canvas, doc):
+        """Draft pages carry only a page number so page breaks stay visible"""
+        canvas.setFont(self.font_regular, 9)
+        canvas.drawRightString(letter[0] - inch, 0.5*inch, f"Page {doc.page}")
+    
     def add_header_footer(self, canvas, doc):
         """Add header and footer to each page"""
         canvas.saveState()
+        if self.chrome_form:
+            # Stored once in the file and referenced from every page
+            if not canvas.hasForm('chrome'):
+                canvas.beginForm('chrome')
+                self.draw_chrome(canvas)
+                canvas.endForm()
+            canvas.doForm('chrome')
+        else:
+            self.draw_chrome(canvas)
+        
+        # Page number
+        canvas.setFillColor(AWS_DARK)
+        canvas.setFont(self.font_regular, 9)
+        canvas.drawRightString(letter[0] - inch, 0.5*inch, f"Page {doc.page}")
         
+        canvas.restoreState()
+    
+    def draw_chrome(self, canvas):
+        """Header bar, footer and author line, identical on every page"""
         # Header - AWS branding bar
         canvas.setFillColor(AWS_ORANGE)
         canvas.rect(0, letter[1] - 0.5*inch, letter[0], 0.5*inch, fill=True, stroke=False)
         
         # Footer
         canvas.setFillColor(AWS_DARK)
-        canvas.setFont('Helvetica', 9)
-        footer_text = "AWS Certification Study Material | LinkedIn Post"
-        canvas.drawCentredString(letter[0]/2, 0.7*inch, footer_text)
+        canvas.setFont(self.font_regular, 9)
+        canvas.drawCentredString(letter[0]/2, 0.7*inch, self.footer_text)
         
         # Author name
-        canvas.setFont('Helvetica-Bold', 10)
+        canvas.setFont(self.font_bold, 10)
         canvas.setFillColor(AWS_ORANGE)
-        author_text = "Kahaf Sameer - DevOps Engineer"
-        canvas.drawCentredString(letter[0]/2, 0.4*inch, author_text)
+        canvas.drawCentredString(letter[0]/2, 0.4*inch, self.author_text)
+    
+    def paragraph(self, text, style, layout, slot):
+        """Create a paragraph, reusing markup parsed during validation and the fragment cache"""
+        frags = self.parsed.get((style.name, text))
+        if frags is None:
+            self.markup_misses += 1
+        else:
+            self.markup_hits += 1
+        if layout is None:
+            return Paragraph(text, style, frags=frags)
+        return CachedParagraph(text, style, frags=frags, layout=layout, slot=slot)
+    
+    def markup_items(self, title, content_sections):
+        """(location, text, style name) of every paragraph create_pdf will lay out"""
+        yield 'title', title, 'CustomTitle'
+        for i, section in enumerate(content_sections, 1):
+            where = f"section {i}"
+            if 'subtitle' in section:
+                yield f"{where} subtitle", section['subtitle'], 'CustomSubtitle'
+            if 'text' in section:
+                yield f"{where} text", section['text'], 'CustomBody'
+            for j, bullet in enumerate(section.get('bullets', []), 1):
+                yield f"{where} bullet {j}", f"• {bullet}", 'CustomBullet'
+            if 'box' in section:
+                yield f"{where} box", section['box'], 'DraftBox' if self.draft else 'CustomBody'
+    
+    def validate(self, topics):
+        """Check the schema and inline markup of every topic; returns all errors found.
         
-        # Page number
-        canvas.setFillColor(AWS_DARK)
-        canvas.setFont('Helvetica', 9)
-        canvas.drawRightString(letter[0] - inch, 0.5*inch, f"Page {doc.page}")
+        Parsed markup is kept for create_pdf, so validating costs almost nothing extra."""
+        if self.styles is None:
+            self.styles = self.create_custom_styles()
+        errors = []
+        filenames = set()
+        for n, topic in enumerate(topics, 1):
+            if not isinstance(topic, tuple) or len(topic) != 3:
+                errors.append(f"topic {n}: expected (filename, title, sections)")
+                continue
+            filename, title, sections = topic
+            name = filename if isinstance(filename, str) else f"topic {n}"
+            if not isinstance(filename, str) or not filename.endswith('.pdf'):
+                errors.append(f"{name}: filename must be a string ending in .pdf")
+            elif os.path.basename(filename) != filename:
+                errors.append(f"{name}: filename must not contain a directory")
+            elif filename in filenames:
+                errors.append(f"{name}: duplicate filename")
+            filenames.add(filename)
+            if not isinstance(title, str) or not title.strip():
+                errors.append(f"{name}: title must be a non-empty string")
+                continue
+            if not isinstance(sections, list) or not sections:
+                errors.append(f"{name}: sections must be a non-empty list")
+                continue
+            
+            # Markup is still checked in every well-formed field of a malformed section
+            checked = []
+            for i, section in enumerate(sections, 1):
+                where = f"{name} section {i}"
+                if not isinstance(section, dict) or not section:
+                    errors.append(f"{where}: must be a non-empty dict")
+                    checked.append({})
+                    continue
+                unknown = sorted(set(section) - set(SECTION_KEYS), key=str)
+                if unknown:
+                    errors.append(f"{where}: unknown keys {', '.join(map(repr, unknown))} "
+                                  f"(allowed: {', '.join(SECTION_KEYS)})")
+                fields = {}
+                for key in ('subtitle', 'text', 'box'):
+                    value = section.get(key)
+                    if isinstance(value, str) and value.strip():
+                        fields[key] = value
+                    elif key in section:
+                        errors.append(f"{where} {key}: must be a non-empty string")
+                if 'bullets' in section:
+                    bullets = section['bullets']
+                    if not isinstance(bullets, list) or not bullets:
+                        errors.append(f"{where} bullets: must be a non-empty list")
+                        bullets = []
+                    for j, bullet in enumerate(bullets, 1):
+                        if not isinstance(bullet, str) or not bullet.strip():
+                            errors.append(f"{where} bullet {j}: must be a non-empty string")
+                    fields['bullets'] = [b if isinstance(b, str) else '' for b in bullets]
+                checked.append(fields)
+            
+            for where, text, style_name in self.markup_items(title, checked):
+                if text.strip('• '):
+                    errors.extend(f"{name} {where}: {problem}" for problem in self.parse_markup(text, style_name))
+        return errors
+    
+    def validated_markup(self, title, content_sections):
+        """Markup of one topic parsed by validate, to send along with its render job"""
+        keys = ((style_name, text) for _, text, style_name in self.markup_items(title, content_sections))
+        return {key: self.parsed[key] for key in keys if key in self.parsed}
+    
+    def parse_markup(self, text, style_name):
+        """Parse one paragraph's markup into the cache; returns its problems"""
+        problems = []
+        for m in AMPERSAND.finditer(text):
+            if m.group(1) is None:
+                problems.append(f"stray '&' in {text[max(0, m.start() - 15):m.end() + 15]!r} (write &amp;)")
+            elif m.group(2) and m.group(2) not in known_entities:
+                problems.append(f"unknown entity '&{m.group(2)};'")
+        key = (style_name, text)
+        if key not in self.parsed:
+            try:
+                self.parsed[key] = Paragraph(text, self.styles[style_name]).frags
+            except ValueError as e:
+                problems.append(str(e).split('caused exception ')[-1].strip())
+        return problems
+    
+    def section_layout(self, section, styles, frame_width):
+        """Load the cached layout of one section; returns (key, layout)"""
+        if self.fragment_cache is None:
+            return None, None
+        key = self.fragment_cache.section_key(section, styles, frame_width)
+        return key, self.fragment_cache.load(key)
+    
+    def content_digest(self, title, content_sections):
+        """Digest of everything that determines a document's pages"""
+        payload = json.dumps({'title': title, 'sections': content_sections, 'draft': self.draft,
+                              'compression': self.page_compression, 'fonts': self.fonts,
+                              'dedupe': self.dedupe_streams, 'linearize': self.linearize,
+                              'chrome': [self.footer_text, self.author_text]},
+                             sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def seal_document(self, canvas, digest):
+        """Pin the timestamp and derive the document ID from the content digest"""
+        pdf_doc = canvas._doc
+        if self.timestamp is not None:
+            pdf_doc._timeStamp = fixed_timestamp(self.timestamp)
+        pdf_doc.updateSignature(digest)
+    
+    def load_manifest(self):
+        path = os.path.join(self.output_dir, MANIFEST_NAME)
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def write_manifest(self):
+        """Write filename -> content digest for every document built in this run"""
+        path = os.path.join(self.output_dir, MANIFEST_NAME)
+        self.write_file(path, json.dumps(self.manifest, indent=2, sort_keys=True).encode('utf-8'))
+    
+    def write_file(self, path, data):
+        """Write through a temporary file; in batch mode the rename waits for publish()"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        if self.batch:
+            self.staged.append((tmp_path, path, hashlib.sha256(data).hexdigest()))
+        else:
+            os.replace(tmp_path, path)
+    
+    def publish(self):
+        """Publish the staged batch: one sync for all files, then atomic renames with the manifest last.
         
-        canvas.restoreState()
+        The batch is checked before the first rename. Returns the problems found; after a problem
+        the files not yet published are deleted."""
+        self.write_manifest()
+        staged, self.staged = self.staged, []
+        errors = staging_errors(staged)
+        if not errors:
+            try:
+                sync_files([tmp_path for tmp_path, _, _ in staged])
+            except OSError as e:
+                errors.append(f"syncing the staged files failed: {e}")
+        if errors:
+            self.discard(staged)
+            return errors
+        published = 0
+        for tmp_path, path, _ in staged:
+            try:
+                os.replace(tmp_path, path)
+            except OSError as e:
+                errors.append(f"publishing {path} failed: {e} ({published} of {len(staged)} files were "
+                              "published, not the manifest)")
+                self.discard(staged[published:])
+                break
+            published += 1
+        sync_directories({os.path.dirname(path) for _, path, _ in staged[:published]})
+        return errors
     
-    def create_pdf(self, filename, title, content_sections):
-        """Create a professional PDF with the given content"""
+    def discard(self, staged=None):
+        """Delete staged files (by default the whole batch) without publishing them"""
+        if staged is None:
+            staged, self.staged = self.staged, []
+        for tmp_path, _, _ in staged:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_path)
+    
+    def write_output(self, filename, data):
+        """Write a finished PDF, skipping the write when the bytes are unchanged"""
         filepath = os.path.join(self.output_dir, filename)
-        doc = SimpleDocTemplate(filepath, pagesize=letter,
-                                rightMargin=72, leftMargin=72,
-                                topMargin=1*inch, bottomMargin=1*inch)
+        if self.content_store is not None:
+            digest, deduplicated = self.content_store.put(data)
+        else:
+            digest, deduplicated = hashlib.sha256(data).hexdigest(), False
         
+        previous = self.previous_manifest.get(filename, {}).get('sha256')
+        changed = not (previous == digest and os.path.exists(filepath))
+        if changed:
+            self.write_file(filepath, data)
+        self.manifest[filename] = {
+            'sha256': digest,
+            'bytes': len(data),
+            'changed': changed,
+            'deduplicated': deduplicated,
+            'size': pdf_objects.size_breakdown(data),
+            'over_budget': self.size_budget is not None and len(data) > self.size_budget,
+        }
+        return changed
+    
+    def postprocess(self, data):
+        """Rewrite a finished PDF (stream deduplication, linearization)"""
+        if self.dedupe_streams:
+            pdf = pdf_objects.parse_pdf(data)
+            if pdf_objects.deduplicate_streams(pdf):
+                data = pdf_objects.write_pdf(pdf)
+        if self.linearize:
+            data = pdf_linearize.linearize(data)
+            problems = pdf_linearize.verify_linearization(data)
+            if problems:
+                raise ValueError("linearization check failed: " + "; ".join(problems))
+        return data
+    
+    def stamp_copies(self, filename, data):
+        """Write one watermarked copy of a rendered document per recipient"""
+        stamper = pdf_stamp.OverlayStamper(data)
+        for name, recipient_id in self.recipients:
+            folder = os.path.join(self.copies_dir, recipient_folder(name, recipient_id))
+            os.makedirs(folder, exist_ok=True)
+            self.write_file(os.path.join(folder, filename), stamper.stamp(name, recipient_id))
+        return len(self.recipients)
+    
+    def new_document(self, buffer, filename, title, content):
+        """Document template writing into buffer, sealed for reproducible output"""
+        doc = SimpleDocTemplate(buffer, pagesize=letter,
+                                rightMargin=72, leftMargin=72,
+                                topMargin=1*inch, bottomMargin=1*inch,
+                                invariant=1 if self.reproducible else None,
+                                pageCompression=0 if self.page_compression == 'none' else 1)
+        if self.reproducible:
+            digest = self.content_digest(title, content)
+            doc.beforeDocument = lambda: self.seal_document(doc.canv, digest)
+        return doc
+    
+    def topic_story(self, title, content_sections, frame_width):
+        """Flowables for one topic, with the section layouts they use"""
         story = []
-        styles = self.create_custom_styles()
+        if self.styles is None:
+            # Styles do not depend on the document, so they are built once per generator
+            self.styles = self.create_custom_styles()
+        styles = self.styles
+        layouts = []
         
         # Title
+        key, layout = self.section_layout({'title': title}, [styles['CustomTitle']], frame_width)
+        layouts.append((key, layout))
         story.append(Spacer(1, 0.3*inch))
-        story.append(Paragraph(title, styles['CustomTitle']))
+        story.append(self.paragraph(title, styles['CustomTitle'], layout, 0))
         story.append(Spacer(1, 0.2*inch))
         
         # Add a decorative line
@@ -128,24 +789,34 @@ class PDFGenerator:
         story.append(Spacer(1, 0.3*inch))
         
         # Content sections
+        section_styles = [styles['CustomSubtitle'], styles['CustomBody'], styles['CustomBullet']]
         for section in content_sections:
+            # Draft boxes wrap with their own style, so it is part of the key of sections with a box
+            key_styles = section_styles + [styles['DraftBox']] if self.draft and 'box' in section else section_styles
+            key, layout = self.section_layout(section, key_styles, frame_width)
+            layouts.append((key, layout))
+            
             if 'subtitle' in section:
-                story.append(Paragraph(section['subtitle'], styles['CustomSubtitle']))
+                story.append(self.paragraph(section['subtitle'], styles['CustomSubtitle'], layout, 'subtitle'))
                 story.append(Spacer(1, 0.1*inch))
             
             if 'text' in section:
-                story.append(Paragraph(section['text'], styles['CustomBody']))
+                story.append(self.paragraph(section['text'], styles['CustomBody'], layout, 'text'))
                 story.append(Spacer(1, 0.15*inch))
             
             if 'bullets' in section:
-                for bullet in section['bullets']:
+                for i, bullet in enumerate(section['bullets']):
                     bullet_text = f"• {bullet}"
-                    story.append(Paragraph(bullet_text, styles['CustomBullet']))
+                    story.append(self.paragraph(bullet_text, styles['CustomBullet'], layout, ('bullet', i)))
                 story.append(Spacer(1, 0.15*inch))
             
-            if 'box' in section:
+            if 'box' in section and self.draft:
+                # Kept in one piece, like the unsplittable table of the final build
+                story.append(KeepTogether([self.paragraph(section['box'], styles['DraftBox'], layout, 'box')]))
+                story.append(Spacer(1, 0.2*inch))
+            elif 'box' in section:
                 # Create a highlighted box for key information
-                box_data = [[Paragraph(section['box'], styles['CustomBody'])]]
+                box_data = [[self.paragraph(section['box'], styles['CustomBody'], layout, 'box')]]
                 box_table = Table(box_data, colWidths=[6*inch])
                 box_table.setStyle(TableStyle([
                     ('BACKGROUND', (0, 0), (-1, -1), AWS_LIGHT_GRAY),
@@ -157,16 +828,389 @@ class PDFGenerator:
                 ]))
                 story.append(box_table)
                 story.append(Spacer(1, 0.2*inch))
+        return story, layouts
+    
+    def create_pdf(self, filename, title, content_sections):
+        """Create a professional PDF with the given content"""
+        start = time.perf_counter()
+        self.markup_hits = self.markup_misses = 0
+        buffer = io.BytesIO()
+        doc = self.new_document(buffer, filename, title, content_sections)
+        story, layouts = self.topic_story(title, content_sections, doc.width)
+        self.build_document(filename, doc, buffer, story, layouts, start)
+    
+    def create_compendium(self, filename, title, topics):
+        """All topics in one PDF: continuous page numbers, one outline entry and
+        named destination per topic, fonts and page chrome stored once"""
+        start = time.perf_counter()
+        self.markup_hits = self.markup_misses = 0
+        buffer = io.BytesIO()
+        doc = self.new_document(buffer, filename, title, topics)
+        story = []
+        layouts = []
+        for topic_filename, topic_title, content_sections in topics:
+            if story:
+                story.append(PageBreak())
+            story.append(TopicMarker(topic_anchor(topic_filename), topic_title))
+            topic_flowables, topic_layouts = self.topic_story(topic_title, content_sections, doc.width)
+            story.extend(topic_flowables)
+            layouts.extend(topic_layouts)
+        self.chrome_form = True
+        try:
+            self.build_document(filename, doc, buffer, story, layouts, start)
+        finally:
+            self.chrome_form = False
+    
+    def build_isolated(self, filename, build, *args):
+        """Run build(filename, *args) so that a failure only loses this document; returns True on success"""
+        start = time.perf_counter()
+        staged = len(self.staged)
+        try:
+            build(filename, *args)
+            return True
+        except Exception as e:
+            # Drop this document's staged files; the published copy (if any) stays as it was
+            self.discard(self.staged[staged:])
+            del self.staged[staged:]
+            if filename in self.previous_manifest:
+                self.manifest[filename] = self.previous_manifest[filename]
+            else:
+                self.manifest.pop(filename, None)
+            self.last_event = {'event': 'document', 'file': filename, 'result': 'failed',
+                               'seconds': round(time.perf_counter() - start, 6), 'error': repr(e)}
+            self.metrics.observe(self.last_event)
+            print(f"✗ Failed: {filename}: {e!r}")
+            return False
+    
+    def build_document(self, filename, doc, buffer, story, layouts, start):
+        """Lay out the story, then post-process, write, record and report the document"""
+        page_decorator = self.add_draft_page_number if self.draft else self.add_header_footer
+        with rl_settings(useA85=1 if self.page_compression == 'ascii85' else 0):
+            doc.build(story, onFirstPage=page_decorator, onLaterPages=page_decorator)
+        data = self.postprocess(buffer.getvalue())
+        changed = self.write_output(filename, data)
+        if self.recipients:
+            self.stamp_copies(filename, data)
+        self.manifest[filename]['pages'] = doc.page
+        
+        # Persist any section layouts computed during this build
+        if self.fragment_cache is not None:
+            for key, layout in layouts:
+                self.fragment_cache.store(key, layout)
         
-        # Build PDF
-        doc.build(story, onFirstPage=self.add_header_footer, onLaterPages=self.add_header_footer)
-        print(f"✓ Created: {filename}")
+        layouts = [layout for _, layout in layouts if layout is not None]
+        self.last_event = {'event': 'document', 'file': filename,
+                           'result': 'rendered' if changed else 'skipped',
+                           'seconds': round(time.perf_counter() - start, 6), 'pages': doc.page,
+                           'bytes': len(data),
+                           'layout_hits': sum(layout.hits for layout in layouts),
+                           'layout_misses': sum(layout.misses for layout in layouts),
+                           'markup_hits': self.markup_hits, 'markup_misses': self.markup_misses}
+        self.metrics.observe(self.last_event)
+        if changed:
+            print(f"✓ Created: {filename}")
+        else:
+            print(f"= Unchanged: {filename}")
+        if self.manifest[filename]['over_budget']:
+            print(f"⚠ Over size budget: {filename} ({self.manifest[filename]['bytes']:,} bytes)")
+
+def print_size_report(generator):
+    """Per-document size breakdown from the manifest, flagging documents over budget"""
+    print(f"{'Document':40} {'Total':>9} {'Fonts':>9} {'Images':>9} {'Content':>9} {'Other':>9}")
+    totals = {'bytes': 0, 'fonts': 0, 'images': 0, 'content': 0, 'other': 0}
+    for name, entry in sorted(generator.manifest.items()):
+        size = entry['size']
+        flag = "  ⚠ over budget" if entry['over_budget'] else ""
+        print(f"{name:40} {entry['bytes']:>9,} {size['fonts']:>9,} {size['images']:>9,} "
+              f"{size['content']:>9,} {size['other']:>9,}{flag}")
+        totals['bytes'] += entry['bytes']
+        for key in ('fonts', 'images', 'content', 'other'):
+            totals[key] += size[key]
+    print(f"{'Total':40} {totals['bytes']:>9,} {totals['fonts']:>9,} {totals['images']:>9,} "
+          f"{totals['content']:>9,} {totals['other']:>9,}")
+    over = [name for name, entry in generator.manifest.items() if entry['over_budget']]
+    if over:
+        print(f"⚠ {len(over)} document(s) over the size budget of {generator.size_budget:,} bytes")
+    return over
+
+def print_compendium_report(generator, topics, individual_time, compendium_time, failed=()):
+    """Compendium size and build time against the individual files that were built"""
+    individual = [generator.manifest[filename] for filename, _, _ in topics
+                  if filename not in failed and filename in generator.manifest]
+    compendium = generator.manifest[COMPENDIUM_FILE]
+    total_bytes = sum(entry['bytes'] for entry in individual)
+    print(f"\nCompendium: {compendium['pages']} pages, {compendium['bytes']:,} bytes, {compendium_time:.2f}s")
+    print(f"Individual: {sum(entry['pages'] for entry in individual)} pages, {total_bytes:,} bytes, "
+          f"{individual_time:.2f}s for {len(individual)} files")
+    if total_bytes:
+        print(f"Size: {compendium['bytes'] / total_bytes:.0%} of the individual files combined")
 
-def main():
-    generator = PDFGenerator()
+def safe_filename(text):
+    """Filesystem-safe version of a recipient name or ID"""
+    cleaned = ''.join(ch if ch.isalnum() or ch in '-_.' else '_' for ch in text.strip())
+    return cleaned.strip('.') or 'recipient'
+
+def recipient_folder(name, recipient_id):
+    """Name of a recipient's folder under the copies directory"""
+    return safe_filename(recipient_id or name)
+
+def load_recipients(path):
+    """Read (name, id) pairs from a CSV with 'name' and 'id' columns"""
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    return [(row['name'].strip(), (row.get('id') or '').strip()) for row in rows if row.get('name')]
+
+def check_recipients(recipients):
+    """Problems that would garble or overwrite stamped copies; returns all errors found"""
+    errors = []
+    # Compared case-insensitively, as folders are on some filesystems
+    folders = {}
+    for name, recipient_id in recipients:
+        label = f"{name!r} ({recipient_id})" if recipient_id else repr(name)
+        missing = pdf_stamp.undrawable(name + recipient_id)
+        if missing:
+            errors.append(f"recipient {label}: {', '.join(missing)} cannot be drawn in the stamp font "
+                          f"({pdf_stamp.STAMP_FONT}, Windows-1252 characters only)")
+        folder = recipient_folder(name, recipient_id)
+        if folder.casefold() in folders:
+            errors.append(f"recipients {folders[folder.casefold()]} and {label} share the copies folder "
+                          f"'{folder}' (give each recipient a distinct id)")
+        else:
+            folders[folder.casefold()] = label
+    return errors
+
+def load_catalog(path):
+    """Read topics from a JSON catalog: [{"filename": ..., "title": ..., "sections": [...]}, ...]"""
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)
+    # Malformed entries are passed through for validate() to report
+    return [(entry.get('filename'), entry.get('title'), entry.get('sections')) if isinstance(entry, dict) else entry
+            for entry in entries]
+
+def topic_name(title):
+    """Short topic label from a document title ("What is X?" -> "X")"""
+    return re.sub(r"^What is (an? )?", "", title).rstrip("?")
+
+def term_bullets(section):
+    """(term, definition) pairs from '<b>Term:</b> definition' bullets"""
+    pairs = []
+    for bullet in section.get('bullets', []):
+        m = TERM_BULLET.match(bullet)
+        if m:
+            pairs.append((m.group('term').strip(), m.group('definition').strip()))
+    return pairs
+
+def write_catalog(path, topics):
+    """Write topics in the format read by load_catalog"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump([{'filename': filename, 'title': title, 'sections': sections}
+                   for filename, title, sections in topics], f, indent=1, ensure_ascii=False)
+        f.write("\n")
+
+def benchmark_content(sections):
+    """Synthetic long guide used by the benchmarks"""
+    sentence = ('AWS CodeDeploy automates application deployments to Amazon EC2, '
+                'AWS Fargate, AWS Lambda and on-premises servers, making it easier to '
+                'release new features rapidly while avoiding downtime. ')
+    body = f'<b>Deployments:</b> {sentence * 3}'
+    return [{
+        'subtitle': f'Section {i + 1}',
+        'text': body,
+        'bullets': [f'<b>Point {j + 1}:</b> {sentence}' for j in range(4)],
+        'box': f'<b>Key takeaway {i + 1}:</b> {sentence}',
+    } for i in range(sections)]
+
+def benchmark_fragment_cache(sections=300, runs=3):
+    """Time a cold build of a large document against a rebuild after a one-section edit"""
+    content = benchmark_content(sections)
+    body = content[0]['text']
+    
+    cold_times, warm_times = [], []
+    for run in range(runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            generator = PDFGenerator(os.path.join(tmp, 'out'), os.path.join(tmp, 'cache'))
+            start = time.perf_counter()
+            generator.create_pdf('bench.pdf', 'Fragment Cache Benchmark', content)
+            cold_times.append(time.perf_counter() - start)
+            
+            edited = list(content)
+            edited[sections // 2] = dict(edited[sections // 2], text=body + f' Edited in run {run}.')
+            start = time.perf_counter()
+            generator.create_pdf('bench.pdf', 'Fragment Cache Benchmark', edited)
+            warm_times.append(time.perf_counter() - start)
+    
+    cold, warm = min(cold_times), min(warm_times)
+    print(f"Cold build ({sections} sections):  {cold:.3f}s")
+    print(f"One-section edit rebuild:      {warm:.3f}s")
+    print(f"Speed-up:                      {cold / warm:.1f}x")
+    return cold, warm
+
+def body_lines(path):
+    """Text of the lines inside the frame on every page of a PDF, without the page chrome"""
+    with open(path, 'rb') as f:
+        pages = pdf_snapshot.snapshot(f.read())['pages']
+    return [[line[4] for line in page['lines'] if line[1] >= FRAME_BOTTOM and line[3] <= FRAME_TOP]
+            for page in pages]
+
+def benchmark_draft(sections=300, runs=3):
+    """Time final and draft rendering of the catalog and a long guide, comparing page counts and line breaks"""
+    content = benchmark_content(sections)
+    results = {}
+    for draft in (False, True):
+        timings = {}
+        for _ in range(runs):
+            with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                generator = main(['--output-dir', tmp, '--no-cache'] + (['--draft'] if draft else []))
+                timings.setdefault('catalog', []).append(time.perf_counter() - start)
+                
+                # Long guide without the fragment cache, then again with a warm cache
+                for label, cache_dir in (('guide', None), ('cache', os.path.join(tmp, 'cache'))):
+                    guide = PDFGenerator(os.path.join(tmp, label), cache_dir, draft=draft)
+                    if cache_dir:
+                        guide.create_pdf('bench.pdf', 'Draft Benchmark', content)
+                    start = time.perf_counter()
+                    guide.create_pdf('bench.pdf', 'Draft Benchmark', content)
+                    timings.setdefault(label, []).append(time.perf_counter() - start)
+                lines = {name: body_lines(os.path.join(tmp, name)) for name in generator.manifest}
+                lines['bench.pdf'] = body_lines(os.path.join(tmp, 'cache', 'bench.pdf'))
+                generator.manifest['bench.pdf'] = guide.manifest['bench.pdf']
+        pages = {name: entry['pages'] for name, entry in generator.manifest.items()}
+        results[draft] = ({label: min(values) for label, values in timings.items()}, pages, lines)
     
+    final, draft = results[False], results[True]
+    for label, description in (('catalog', "Catalog (16 topics)"),
+                               ('guide', f"Guide ({sections} sections)"),
+                               ('cache', "Guide, warm layout cache")):
+        print(f"{description:26} final {final[0][label]:.3f}s, draft {draft[0][label]:.3f}s, "
+              f"speed-up {final[0][label] / draft[0][label]:.2f}x")
+    moved = {name: (final[1][name], draft[1][name]) for name in final[1]
+             if final[1][name] != draft[1][name]}
+    print(f"Documents with a different page count: {len(moved)} of {len(final[1])}")
+    for name, (final_pages, draft_pages) in sorted(moved.items()):
+        print(f"  {name}: {final_pages} -> {draft_pages}")
+    rewrapped = {name: next(number for number, (a, b) in enumerate(zip(final[2][name], draft[2][name]), 1) if a != b)
+                 for name in final[2] if final[2][name] != draft[2][name] and name not in moved}
+    print(f"Documents with different line or page breaks: {len(rewrapped) + len(moved)} of {len(final[2])}")
+    for name, page in sorted(rewrapped.items()):
+        print(f"  {name}: first differs on page {page}")
+    return results
+
+def check_linearized(paths):
+    """Verify the linearization dictionary and hint tables of existing PDFs"""
+    failures = 0
+    for path in paths:
+        with open(path, 'rb') as f:
+            data = f.read()
+        if not pdf_linearize.is_linearized(data):
+            problems = ["not linearized"]
+        else:
+            problems = pdf_linearize.verify_linearization(data)
+        if problems:
+            failures += 1
+            print(f"✗ {path}: " + "; ".join(problems))
+        else:
+            print(f"✓ {path}: linearized, hint tables consistent")
+    return failures
+
+def benchmark_stamping(recipients=10000, rerender_sample=50):
+    """Copies/sec for stamping a rendered topic versus re-rendering it per recipient"""
+    content = benchmark_content(6)
+    people = [(f"Recipient {i:05d}", f"WS-{i:05d}") for i in range(recipients)]
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        generator = PDFGenerator(os.path.join(tmp, 'out'), None)
+        start = time.perf_counter()
+        for name, recipient_id in people[:rerender_sample]:
+            generator.author_text = f"{name} - {recipient_id}"
+            generator.create_pdf('topic.pdf', 'Stamping Benchmark', content)
+        rerender_rate = rerender_sample / (time.perf_counter() - start)
+        
+        with open(os.path.join(tmp, 'out', 'topic.pdf'), 'rb') as f:
+            base = f.read()
+        start = time.perf_counter()
+        stamper = pdf_stamp.OverlayStamper(base)
+        for name, recipient_id in people:
+            stamper.stamp(name, recipient_id)
+        memory_rate = recipients / (time.perf_counter() - start)
+        
+        generator.recipients = people
+        start = time.perf_counter()
+        generator.stamp_copies('topic.pdf', base)
+        disk_rate = recipients / (time.perf_counter() - start)
+    
+    print(f"Re-render per recipient ({rerender_sample} sampled): {rerender_rate:,.0f} copies/sec")
+    print(f"Stamp {recipients:,} copies in memory:         {memory_rate:,.0f} copies/sec")
+    print(f"Stamp {recipients:,} copies to disk:           {disk_rate:,.0f} copies/sec")
+    print(f"Speed-up over re-rendering (to disk):     {disk_rate / rerender_rate:.0f}x")
+    return rerender_rate, memory_rate, disk_rate
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the AWS topic PDFs")
+    parser.add_argument('--output-dir', default="AWS_PDFs", help="Directory for generated PDFs")
+    parser.add_argument('--cache-dir', default=LAYOUT_CACHE_DIR, help="Directory for the layout fragment cache")
+    parser.add_argument('--no-cache', action='store_true', help="Disable the layout fragment cache")
+    parser.add_argument('--cache-max-mb', type=float, default=LAYOUT_CACHE_MAX_BYTES / (1024 * 1024),
+                        help="Evict cached layouts beyond this size")
+    parser.add_argument('--reproducible', action='store_true',
+                        help="Byte-for-byte reproducible output with content-addressed storage")
+    parser.add_argument('--timestamp', type=int, default=None,
+                        help="Creation time for reproducible output (default: SOURCE_DATE_EPOCH or 2000-01-01)")
+    parser.add_argument('--store-dir', default=CONTENT_STORE_DIR,
+                        help="Content-addressed store used with --reproducible")
+    parser.add_argument('--draft', action='store_true',
+                        help="Fast draft rendering: left-aligned text, plain boxes, no page chrome or compression")
+    parser.add_argument('--page-compression', choices=PAGE_COMPRESSION_MODES, default='ascii85',
+                        help="Content stream encoding: Flate+ASCII85 (ReportLab default), binary Flate, or none")
+    parser.add_argument('--fonts', choices=FONT_MODES, default='standard',
+                        help="standard: base-14 Helvetica, not embedded; embedded: subset-embedded TrueType")
+    parser.add_argument('--dedupe-streams', action='store_true',
+                        help="Store identical streams once in each PDF")
+    parser.add_argument('--size-budget-kb', type=float, default=None,
+                        help="Flag documents larger than this")
+    parser.add_argument('--size-report', action='store_true',
+                        help="Print a per-document size breakdown")
+    parser.add_argument('--linearize', action='store_true',
+                        help="Write linearized (Fast Web View) PDFs")
+    parser.add_argument('--check-linearized', nargs='+', metavar='PDF',
+                        help="Verify the linearization of existing PDFs and exit")
+    parser.add_argument('--recipients', metavar='CSV',
+                        help="Write a watermarked copy of every topic per recipient (CSV with name,id columns)")
+    parser.add_argument('--copies-dir', default=None,
+                        help="Directory for personalised copies (default: <output-dir>/copies)")
+    parser.add_argument('--cross-links', action='store_true',
+                        help="Link mentions of other topics to their PDFs and write the topic dependency graph")
+    parser.add_argument('--compendium', action='store_true',
+                        help=f"Also build {COMPENDIUM_FILE} with every topic and compare it with the individual files")
+    parser.add_argument('--catalog', metavar='JSON',
+                        help="Build the topics of a JSON catalog file instead of the built-in guides")
+    parser.add_argument('--validate', action='store_true',
+                        help="Check the schema and markup of every topic and exit")
+    parser.add_argument('--metrics-file', metavar='PATH',
+                        help="Write build metrics in Prometheus text format (e.g. for a textfile collector)")
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help="Server mode: serve /metrics on this port during and after the build until interrupted")
+    parser.add_argument('--metrics-host', default=build_metrics.METRICS_HOST, metavar='HOST',
+                        help="Address for --metrics-port (default: loopback only; 0.0.0.0 for all interfaces)")
+    parser.add_argument('--log-json', metavar='PATH',
+                        help="Append one JSON line per document and build event ('-' for stdout)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue an interrupted build, reusing the checkpointed documents after verifying their hashes")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Render topics in this many pre-warmed worker processes")
+    parser.add_argument('--benchmark-pool', action='store_true',
+                        help="Benchmark cold worker processes against the warm pool and exit")
+    parser.add_argument('--benchmark-stamp', action='store_true',
+                        help="Benchmark per-recipient stamping against re-rendering and exit")
+    parser.add_argument('--benchmark-draft', action='store_true',
+                        help="Benchmark draft against final rendering and exit")
+    parser.add_argument('--benchmark-cache', action='store_true',
+                        help="Benchmark a one-section edit against a cold build and exit")
+    return parser.parse_args(argv)
+
+# Topic catalog: (output filename, document title, content sections)
+AWS_TOPICS = [
     # 1. Continuous Integration
-    generator.create_pdf(
+    (
         "01_Continuous_Integration.pdf",
         "What is Continuous Integration?",
         [
@@ -201,10 +1245,10 @@ def main():
                 'box': '<b>AWS CI/CD Services:</b> AWS CodePipeline orchestrates the entire CI/CD workflow, AWS CodeBuild handles continuous integration and testing, AWS CodeCommit provides source control, and AWS CodeDeploy automates deployments.'
             }
         ]
-    )
+    ),
     
     # 2. Continuous Delivery
-    generator.create_pdf(
+    (
         "02_Continuous_Delivery.pdf",
         "What is Continuous Delivery?",
         [
@@ -240,10 +1284,10 @@ def main():
                 'box': '<b>Event-Driven Execution:</b> CodePipeline automatically triggers new executions whenever changes are pushed to the source repository, ensuring the latest code is always validated and deployed consistently.'
             }
         ]
-    )
+    ),
     
     # 3. AWS CloudFormation
-    generator.create_pdf(
+    (
         "03_AWS_CloudFormation.pdf",
         "What is AWS CloudFormation?",
         [
@@ -288,10 +1332,10 @@ def main():
                 'box': '<b>How It Works:</b> Define your infrastructure in a CloudFormation template → Deploy the template to create a stack → CloudFormation provisions all specified resources in the correct order → Manage the entire infrastructure as a single unit.'
             }
         ]
-    )
+    ),
     
     # 4. CloudFront Origin Failover
-    generator.create_pdf(
+    (
         "04_CloudFront_Origin_Failover.pdf",
         "Optimizing High Availability with CloudFront Origin Failover",
         [
@@ -333,10 +1377,10 @@ def main():
                 'box': '<b>High Availability:</b> Origin failover significantly enhances application reliability by ensuring content delivery even when primary origins fail. Combined with other AWS services, it provides comprehensive disaster recovery solutions.'
             }
         ]
-    )
+    ),
     
     # 5. Lambda@Edge
-    generator.create_pdf(
+    (
         "05_Lambda_CloudFront_Edge.pdf",
         "Using AWS Lambda with CloudFront Lambda@Edge",
         [
@@ -377,10 +1421,10 @@ def main():
                 'box': '<b>Edge Computing Power:</b> Lambda@Edge enables you to execute custom logic at AWS edge locations worldwide, providing millisecond latency improvements and enhanced user experiences without managing servers.'
             }
         ]
-    )
+    ),
     
     # 6. CodePipeline Best Practices
-    generator.create_pdf(
+    (
         "06_CodePipeline_Best_Practices.pdf",
         "CodePipeline Best Practices and Use Cases",
         [
@@ -434,10 +1478,10 @@ def main():
                 'box': '<b>Use Cases:</b> Web applications to Elastic Beanstalk, containerized apps to ECS/EKS, serverless Lambda functions, EC2 deployments, infrastructure as code with CloudFormation, and integration with third-party tools.'
             }
         ]
-    )
+    ),
     
     # 7. Continuous Delivery with CodePipeline (duplicate content merged with #2 and #6)
-    generator.create_pdf(
+    (
         "07_CD_with_CodePipeline.pdf",
         "Continuous Delivery with CodePipeline",
         [
@@ -491,10 +1535,10 @@ def main():
                 'box': '<b>Event-Driven Automation:</b> CodePipeline automatically triggers pipeline executions when changes are detected in source repositories, ensuring continuous validation and deployment of the latest code.'
             }
         ]
-    )
+    ),
     
     # 8. AWS CodeCommit
-    generator.create_pdf(
+    (
         "08_AWS_CodeCommit.pdf",
         "What is AWS CodeCommit?",
         [
@@ -546,10 +1590,10 @@ def main():
                 'box': '<b>Fully Managed Git:</b> CodeCommit provides enterprise-grade source control without the operational overhead of managing your own Git servers, with built-in security, scalability, and AWS service integration.'
             }
         ]
-    )
+    ),
     
     # 9. Elastic Beanstalk
-    generator.create_pdf(
+    (
         "09_Elastic_Beanstalk.pdf",
         "What is AWS Elastic Beanstalk?",
         [
@@ -602,10 +1646,10 @@ def main():
                 'box': '<b>PaaS Benefits:</b> Elastic Beanstalk abstracts infrastructure complexity while maintaining full control over AWS resources. You retain the ability to customize configurations while benefiting from automated management.'
             }
         ]
-    )
+    ),
     
     # 10. Amazon API Gateway
-    generator.create_pdf(
+    (
         "10_Amazon_API_Gateway.pdf",
         "What is Amazon API Gateway?",
         [
@@ -668,10 +1712,10 @@ def main():
                 'box': '<b>Best Practices:</b> Implement least privilege IAM policies, enable CloudWatch logs, use latest TLS protocol, enable response caching and encryption, control access with API keys, rotate SSL certificates regularly, and enable X-Ray tracing.'
             }
         ]
-    )
+    ),
     
     # 11. AWS Systems Manager
-    generator.create_pdf(
+    (
         "11_AWS_Systems_Manager.pdf",
         "What is AWS Systems Manager?",
         [
@@ -738,10 +1782,10 @@ def main():
                 'box': '<b>Operational Excellence:</b> Systems Manager simplifies day-to-day operations by enabling organizations to define system configurations, prevent drift, maintain software compliance, and keep infrastructure secure at scale.'
             }
         ]
-    )
+    ),
     
     # 12. Amazon ECS
-    generator.create_pdf(
+    (
         "12_Amazon_ECS.pdf",
         "What is Amazon Elastic Container Service?",
         [
@@ -804,10 +1848,10 @@ def main():
                 'box': '<b>Container Orchestration:</b> ECS provides enterprise-grade container orchestration with the flexibility to choose between EC2 for full control or Fargate for serverless simplicity, all while maintaining deep AWS integration.'
             }
         ]
-    )
+    ),
     
     # 13. AWS X-Ray
-    generator.create_pdf(
+    (
         "13_AWS_X-Ray.pdf",
         "What is AWS X-Ray?",
         [
@@ -875,10 +1919,10 @@ def main():
                 'box': '<b>Distributed Tracing:</b> X-Ray provides complete visibility into distributed applications, enabling faster debugging, performance optimization, and improved reliability through comprehensive request tracking and analysis.'
             }
         ]
-    )
+    ),
     
     # 14. AppSpec Hooks for ECS
-    generator.create_pdf(
+    (
         "14_AppSpec_Hooks_ECS.pdf",
         "AppSpec 'hooks' Section for Amazon ECS Deployment",
         [
@@ -936,10 +1980,10 @@ def main():
                 'box': '<b>Deployment Validation:</b> AppSpec hooks for ECS enable automated validation and testing at critical points in the deployment lifecycle, ensuring safe and reliable container deployments with custom logic.'
             }
         ]
-    )
+    ),
     
     # 15. CodeDeploy Deployments
-    generator.create_pdf(
+    (
         "15_CodeDeploy_Deployments.pdf",
         "AWS CodeDeploy Deployment Strategies",
         [
@@ -1014,10 +2058,10 @@ def main():
                 'box': '<b>Strategy Selection:</b> Choose deployment strategy based on acceptable downtime, rollback requirements, and risk tolerance. Blue/green offers safest rollback, canary enables gradual testing, and in-place is most cost-effective.'
             }
         ]
-    )
+    ),
     
     # 16. AppSpec Hooks for EC2/On-Premises
-    generator.create_pdf(
+    (
         "16_AppSpec_Hooks_EC2.pdf",
         "AppSpec 'hooks' Section for EC2/On-Premises Deployment",
         [
@@ -1080,12 +2124,194 @@ def main():
                 'box': '<b>Deployment Automation:</b> AppSpec hooks enable comprehensive automation of deployment tasks, from graceful application shutdown to validation testing, ensuring reliable and consistent deployments to EC2 and on-premises infrastructure.'
             }
         ]
-    )
+    ),
+]
+
+def main(argv=None, topics=None):
+    """Build the catalog: the built-in guides, --catalog, or topics passed in directly"""
+    args = parse_args(argv)
+    if args.check_linearized:
+        if check_linearized(args.check_linearized):
+            raise SystemExit(1)
+        return
+    if args.benchmark_cache:
+        benchmark_fragment_cache()
+        return
+    if args.benchmark_draft:
+        benchmark_draft()
+        return
+    if args.benchmark_stamp:
+        benchmark_stamping()
+        return
+    if args.benchmark_pool:
+        render_pool.benchmark_pool()
+        return
+    
+    recipients = load_recipients(args.recipients) if args.recipients else None
+    errors = check_recipients(recipients) if recipients else []
+    for error in errors:
+        print(f"✗ {error}")
+    if errors:
+        raise SystemExit(f"{len(errors)} recipient error(s); no PDFs were built")
+    
+    options = dict(output_dir=args.output_dir, cache_dir=None if args.no_cache else args.cache_dir,
+                   reproducible=args.reproducible, timestamp=args.timestamp,
+                   store_dir=args.store_dir if args.reproducible else None,
+                   draft=args.draft, page_compression=args.page_compression,
+                   fonts=args.fonts, dedupe_streams=args.dedupe_streams,
+                   size_budget=int(args.size_budget_kb * 1024) if args.size_budget_kb else None,
+                   linearize=args.linearize,
+                   recipients=recipients,
+                   copies_dir=args.copies_dir, batch=True)
+    generator = PDFGenerator(**options)
+    log = None
+    if args.log_json == '-':
+        log = sys.stdout
+    elif args.log_json:
+        log = open(args.log_json, 'a')
+    generator.metrics.log = log
+    server = build_metrics.serve(generator.metrics, args.metrics_port, args.metrics_host) if args.metrics_port else None
+    if generator.fragment_cache is not None:
+        generator.fragment_cache.max_bytes = int(args.cache_max_mb * 1024 * 1024)
+    
+    if args.catalog:
+        topics = load_catalog(args.catalog)
+    catalog = topics = topics if topics is not None else AWS_TOPICS
+    linker = None
+    if args.cross_links:
+        linker = topic_links.TopicLinker(topics)
+        topics = linker.link_topics(topics)
+    
+    # Validate the whole catalog before any layout, reporting every problem at once
+    errors = generator.validate(topics)
+    if args.compendium and not errors:
+        # Inside the bundle, cross-topic links jump to the topic's named destination
+        bundle = topics
+        if linker is not None:
+            bundle = topic_links.TopicLinker(catalog, target=lambda f: "#" + topic_anchor(f)).link_topics(catalog)
+            errors = generator.validate(bundle)
+    for error in errors:
+        print(f"✗ {error}")
+    if errors:
+        raise SystemExit(f"{len(errors)} content error(s); no PDFs were built")
+    if args.validate:
+        print(f"✓ {len(topics)} topics valid")
+        return generator
+    
+    # Every completed document is checkpointed; --resume reuses verified ones from an interrupted run
+    digests = {filename: generator.content_digest(title, content_sections)
+               for filename, title, content_sections in topics}
+    if args.compendium:
+        digests[COMPENDIUM_FILE] = generator.content_digest(COMPENDIUM_TITLE, bundle)
+    checkpoint = build_checkpoint.BuildCheckpoint(
+        os.path.join(generator.output_dir, build_checkpoint.CHECKPOINT_NAME),
+        {key: value for key, value in options.items() if key != 'cache_dir'})
+    resumed = checkpoint.start(digests, resume=args.resume)
+    for filename, record in resumed.items():
+        generator.staged += [tuple(item) for item in record['staged']]
+        generator.manifest[filename] = record['entry']
+        generator.metrics.observe({'event': 'document', 'file': filename, 'result': 'resumed'})
+    if args.resume:
+        print(f"↻ Resuming: {len(resumed)} of {len(digests)} documents verified from the checkpoint")
+    pending = [topic for topic in topics if topic[0] not in resumed]
+    
+    def completed(filename, entry, staged, event):
+        checkpoint.record(filename, digests[filename], os.path.join(generator.output_dir, filename),
+                          entry, staged, event)
+    
+    # Outputs are staged and published together at the end; a failing topic does not stop the others
+    start = time.perf_counter()
+    failed = []
+    try:
+        if args.workers > 1 and pending:
+            with render_pool.RenderPool(args.workers, **options) as pool:
+                jobs = ((filename, title, content_sections, generator.validated_markup(title, content_sections))
+                        for filename, title, content_sections in pending)
+                for filename, entry, _, output, event, staged in pool.render(jobs):
+                    generator.staged += staged
+                    if entry is None:
+                        # A job lost with its worker: the published copy (if any) stays as it was
+                        entry = generator.previous_manifest.get(filename)
+                    if entry is not None:
+                        generator.manifest[filename] = entry
+                    if event['result'] == 'failed':
+                        failed.append(filename)
+                    else:
+                        completed(filename, entry, staged, event)
+                    generator.metrics.observe(event)
+                    print(output, end="")
+        else:
+            for filename, title, content_sections in pending:
+                staged = len(generator.staged)
+                if generator.build_isolated(filename, generator.create_pdf, title, content_sections):
+                    completed(filename, generator.manifest[filename], generator.staged[staged:], generator.last_event)
+                else:
+                    failed.append(filename)
+        individual_time = time.perf_counter() - start
+        compendium_time = 0.0
+        if args.compendium and COMPENDIUM_FILE not in resumed:
+            start = time.perf_counter()
+            staged = len(generator.staged)
+            if generator.build_isolated(COMPENDIUM_FILE, generator.create_compendium, COMPENDIUM_TITLE, bundle):
+                completed(COMPENDIUM_FILE, generator.manifest[COMPENDIUM_FILE], generator.staged[staged:],
+                          generator.last_event)
+            else:
+                failed.append(COMPENDIUM_FILE)
+            compendium_time = time.perf_counter() - start
+    except BaseException as e:
+        # Anything beyond a single document (a crashed worker, Ctrl-C) publishes nothing;
+        # checkpointed documents stay staged for --resume
+        checkpoint.close()
+        generator.discard([item for item in generator.staged if item[0] not in checkpoint.staged])
+        generator.metrics.build_failed(repr(e))
+        generator.metrics.finish()
+        if args.metrics_file:
+            generator.metrics.write_file(args.metrics_file)
+        raise
+    if linker is not None:
+        topic_links.write_graph(linker.graph, topics, generator.output_dir, generator.write_file)
+    
+    publish_errors = generator.publish()
+    checkpoint.finish()
+    if publish_errors:
+        for error in publish_errors:
+            print(f"✗ {error}")
+        generator.metrics.build_failed("; ".join(publish_errors))
+        generator.metrics.finish()
+        if args.metrics_file:
+            generator.metrics.write_file(args.metrics_file)
+        raise SystemExit(f"{len(publish_errors)} publish error(s); the batch was not published")
+    # Eviction is housekeeping: it runs once the batch is safely published
+    if generator.fragment_cache is not None:
+        generator.fragment_cache.evict()
     
     print("\n" + "="*60)
-    print("✓ All 16 AWS PDF files created successfully!")
+    if failed:
+        print(f"✗ {len(failed)} of {len(topics) + bool(args.compendium)} PDF files failed: {', '.join(failed)}")
+    else:
+        print(f"✓ All {len(topics)} AWS PDF files created successfully!")
     print(f"✓ Location: {os.path.abspath(generator.output_dir)}")
     print("="*60)
+    if args.size_report or generator.size_budget is not None:
+        print_size_report(generator)
+    if args.compendium and COMPENDIUM_FILE not in failed:
+        print_compendium_report(generator, topics, individual_time, compendium_time, failed)
+    
+    generator.metrics.finish()
+    if args.metrics_file:
+        generator.metrics.write_file(args.metrics_file)
+    if log is not None and log is not sys.stdout:
+        log.close()
+    if server is not None:
+        print(f"Serving metrics on http://{args.metrics_host}:{args.metrics_port}/metrics (Ctrl-C to stop)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
+    if failed:
+        raise SystemExit(1)
+    return generator
 
 if __name__ == "__main__":
     main()
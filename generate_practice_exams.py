@@ -0,0 +1,202 @@
+"""
+AWS Practice Exam Generator
+Builds a question bank from the topic catalog and renders seeded,
+randomized exam variants with answer keys through PDFGenerator
+"""
+
+import argparse
+import os
+import random
+import re
+import time
+
+from generate_aws_pdfs import AWS_TOPICS, TAG, term_bullets, topic_name
+from render_pool import RenderPool
+from topic_links import TOPIC_KEYWORDS
+
+OPTION_LETTERS = "ABCD"
+EXAM_FOOTER = "AWS Certification Practice Exam"
+
+# Sections whose term bullets are listed in execution order
+ORDERED_SECTION = re.compile(r'order|lifecycle|hooks', re.IGNORECASE)
+# Takeaways may name their own service with or without this prefix
+SERVICE_PREFIX = re.compile(r'^(AWS|Amazon) ')
+# Takeaways sharing this fraction of their words are too alike to tell apart
+WORD = re.compile(r"[a-z0-9@-]+")
+SIMILAR_TAKEAWAY = 0.3
+
+class Question:
+    """Multiple-choice question: one correct answer and a pool of distractors"""
+    def __init__(self, kind, topic, prompt, answer, distractors, near=8):
+        self.kind = kind
+        self.topic = topic
+        self.prompt = prompt
+        self.answer = answer
+        self.distractors = [d for d in dict.fromkeys(distractors) if d != answer]
+        # Distractors are listed nearest first; options are drawn from the first `near`
+        self.near = near
+
+def topic_names(filename, topic):
+    """Pattern matching every name of a topic: its label and link keywords, with or without the AWS/Amazon prefix"""
+    names = {topic, SERVICE_PREFIX.sub('', topic), *TOPIC_KEYWORDS.get(filename, ())}
+    alternatives = "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+    return re.compile(rf"(?<!\w)(?:(?:AWS|Amazon) )?(?:{alternatives})(?!\w)", re.IGNORECASE)
+
+def word_similarity(first, second):
+    """Jaccard similarity of the word sets of two texts"""
+    first, second = set(WORD.findall(first.lower())), set(WORD.findall(second.lower()))
+    return len(first & second) / len(first | second)
+
+def build_question_bank(topics=AWS_TOPICS):
+    """Derive questions from the term bullets, ordered lifecycles and key-takeaway boxes"""
+    questions = []
+    all_terms = [term for _, _, sections in topics for section in sections
+                 for term, _ in term_bullets(section)]
+    titles = [topic_name(title) for _, title, _ in topics]
+    takeaways = []
+
+    for filename, title, sections in topics:
+        topic = topic_name(title)
+        topic_terms = [pair for section in sections for pair in term_bullets(section)]
+        for section in sections:
+            pairs = term_bullets(section)
+            subtitle = section.get('subtitle', '')
+            if len(pairs) >= 2:
+                terms = [term for term, _ in pairs]
+                definitions = [definition for _, definition in pairs]
+                other_definitions = [d for _, d in topic_terms if d not in definitions]
+                for term, definition in pairs:
+                    # Term -> definition, distractors from the same section first
+                    questions.append(Question(
+                        'definition', topic,
+                        f"{topic}: which statement best describes <b>{term}</b>?",
+                        definition, [d for d in definitions if d != definition] + other_definitions))
+                    # Definition -> term
+                    questions.append(Question(
+                        'term', topic,
+                        f"{topic}: which item matches \"{definition}\"?",
+                        term, [t for t in terms if t != term] + all_terms))
+                # Membership: which of these belongs to the section ("deployment configurations");
+                # wrong answers come from the topic's other sections, or the whole catalog if too few
+                nearby = list(dict.fromkeys(t for t, _ in topic_terms if t not in terms))
+                outside = nearby + [t for t in all_terms if t not in terms and t not in nearby]
+                near = len(nearby) if len(nearby) >= len(OPTION_LETTERS) - 1 else None
+                for term in terms:
+                    questions.append(Question(
+                        'membership', topic,
+                        f"{topic}: which of the following is one of the <b>{subtitle}</b>?",
+                        term, outside, near=near))
+                if ORDERED_SECTION.search(subtitle):
+                    for current, following in zip(terms, terms[1:]):
+                        questions.append(Question(
+                            'order', topic,
+                            f"{topic}: in the {subtitle}, which step runs immediately after "
+                            f"<b>{current}</b>?",
+                            following, [t for t in terms if t not in (current, following)]))
+            if 'box' in section:
+                takeaways.append((topic, TAG.sub('', section['box']), topic_names(filename, topic)))
+
+    # Key takeaway -> topic, with every name of the topic masked out of the statement. A topic whose
+    # own takeaway says nearly the same would be a second right answer, so it is never offered
+    for topic, text, names in takeaways:
+        similar = {other for other, other_text, _ in takeaways
+                   if word_similarity(text, other_text) >= SIMILAR_TAKEAWAY}
+        questions.append(Question(
+            'takeaway', topic,
+            f"Which guide's key takeaway is: \"{names.sub('this service', text)}\"",
+            topic, [t for t in titles if t not in similar], near=None))
+    return [q for q in questions if len(q.distractors) >= len(OPTION_LETTERS) - 1]
+
+def exam_variant(bank, variant, questions, seed):
+    """Pick and shuffle questions for one variant; returns [(question, options, answer letter)]"""
+    rng = random.Random(f"{seed}:{variant}")
+    picked = rng.sample(bank, min(questions, len(bank)))
+    exam = []
+    for question in picked:
+        pool = question.distractors[:question.near]
+        options = rng.sample(pool, len(OPTION_LETTERS) - 1) + [question.answer]
+        rng.shuffle(options)
+        exam.append((question, options, OPTION_LETTERS[options.index(question.answer)]))
+    return exam
+
+def exam_sections(exam):
+    """Content sections (PDFGenerator schema) for the questions of one variant"""
+    sections = []
+    for number, (question, options, _) in enumerate(exam, 1):
+        sections.append({
+            'subtitle': f"Question {number}",
+            'text': question.prompt,
+            'bullets': [f"<b>{letter}.</b> {option}" for letter, option in zip(OPTION_LETTERS, options)],
+        })
+    return sections
+
+def answer_key_sections(exam):
+    """Content sections for the answer key of one variant"""
+    return [{
+        'subtitle': 'Answers',
+        'bullets': [f"<b>{number}. {letter}:</b> {question.answer}"
+                    for number, (question, _, letter) in enumerate(exam, 1)],
+    }, {
+        'box': f"<b>Scoring:</b> {len(exam)} questions, one mark each. "
+               f"Review the matching study guide for every question you missed.",
+    }]
+
+def exam_jobs(bank, variants, questions, seed):
+    """(filename, title, sections) render jobs for variants 1..N: exam, then answer key"""
+    for variant in range(1, variants + 1):
+        exam = exam_variant(bank, variant, questions, seed)
+        label = f"{variant:04d}"
+        yield f"exam_{label}.pdf", f"AWS Practice Exam {label}", exam_sections(exam)
+        yield f"exam_{label}_answers.pdf", f"Answer Key: Exam {label}", answer_key_sections(exam)
+
+def generate_exams(variants, questions=20, seed=0, output_dir="Practice_Exams", workers=None,
+                   cache_dir=None, draft=False):
+    """Render variants 1..N in a warm worker pool; returns the merged manifest.
+
+    Every variant lays out different paragraphs, so by default nothing goes into the layout cache."""
+    bank = build_question_bank()
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    # Reproducible rendering, so a seed always yields byte-identical exams
+    options = {'output_dir': output_dir, 'cache_dir': cache_dir, 'reproducible': True,
+               'footer_text': EXAM_FOOTER, 'draft': draft}
+    manifest = {}
+    with RenderPool(workers, **options) as pool:
+        for filename, entry, _, output, event, _ in pool.render(exam_jobs(bank, variants, questions, seed)):
+            if event['result'] == 'failed':
+                print(output, end="")
+            else:
+                manifest[filename] = entry
+    return manifest
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate randomized AWS practice exams")
+    parser.add_argument('--variants', type=int, default=10, help="Number of exam variants")
+    parser.add_argument('--questions', type=int, default=20, help="Questions per exam")
+    parser.add_argument('--seed', default='aws-exam-prep', help="Seed; the same seed gives the same exams")
+    parser.add_argument('--output-dir', default="Practice_Exams")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--draft', action='store_true', help="Use draft rendering")
+    parser.add_argument('--bank-stats', action='store_true', help="Print question bank statistics and exit")
+    args = parser.parse_args(argv)
+
+    if args.bank_stats:
+        bank = build_question_bank()
+        kinds = {}
+        for question in bank:
+            kinds[question.kind] = kinds.get(question.kind, 0) + 1
+        print(f"{len(bank)} questions: " + ", ".join(f"{kind} {count}" for kind, count in sorted(kinds.items())))
+        return bank
+
+    start = time.perf_counter()
+    manifest = generate_exams(args.variants, args.questions, args.seed, args.output_dir,
+                              args.workers, draft=args.draft)
+    elapsed = time.perf_counter() - start
+    print("="*60)
+    print(f"✓ {args.variants} exam variants ({len(manifest)} PDFs) in {elapsed:.1f}s")
+    print(f"✓ Location: {os.path.abspath(args.output_dir)}")
+    print("="*60)
+    return manifest
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Golden Output Check
+Renders every topic in the warm worker pool, snapshots the text lines and
+shape boxes of each page and compares them with the snapshots stored in
+golden/, printing page-level differences. Pagination changes, dropped or
+reworded content and moved layout all show up; timestamps and stream
+encoding do not
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+import pdf_snapshot
+import render_pool
+from generate_aws_pdfs import AWS_TOPICS
+
+GOLDEN_DIR = "golden"
+
+def golden_path(golden_dir, filename):
+    return os.path.join(golden_dir, os.path.splitext(filename)[0] + ".json")
+
+def snapshot_file(path):
+    with open(path, 'rb') as f:
+        return os.path.basename(path), pdf_snapshot.snapshot(f.read())
+
+def snapshot_topic(job):
+    """Pool job: render one (topic, output directory) and snapshot the written PDF (or the error)"""
+    topic, output_dir = job
+    filename, _, _, output, event, _ = render_pool.render_job(topic)
+    if event['result'] == 'failed':
+        return filename, output.strip()
+    return snapshot_file(os.path.join(output_dir, filename))
+
+def format_snapshot(snapshot):
+    """Snapshot JSON with one text line per row, so snapshot changes diff well in git"""
+    pages = []
+    for page in snapshot['pages']:
+        lines = ",\n".join("    " + json.dumps(line, ensure_ascii=False) for line in page['lines'])
+        pages.append(f'  {{"lines": [\n{lines}],\n   "shapes": {json.dumps(page["shapes"])}}}')
+    return '{"pages": [\n' + ",\n".join(pages) + "]}\n"
+
+def load_golden(golden_dir, filename):
+    try:
+        with open(golden_path(golden_dir, filename), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def snapshots(topics, workers, pdf_dir=None):
+    """(filename, snapshot) for every topic, rendered fresh unless pdf_dir holds an existing build"""
+    if pdf_dir is not None:
+        paths = [os.path.join(pdf_dir, filename) for filename, _, _ in topics]
+        with multiprocessing.Pool(workers) as pool:
+            yield from pool.imap_unordered(snapshot_file, paths)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        with render_pool.RenderPool(workers, output_dir=tmp, cache_dir=None) as pool:
+            yield from pool.map(snapshot_topic, [(topic, tmp) for topic in topics],
+                                lost=lambda job, error: (job[0][0], "worker process died"))
+
+def check(topics=AWS_TOPICS, golden_dir=GOLDEN_DIR, workers=None, pdf_dir=None, update=False):
+    """Compare (or with update, record) snapshots; returns {filename: difference lines} for mismatches"""
+    workers = min(workers or os.cpu_count() or 1, len(topics))
+    failures = {}
+    if update:
+        os.makedirs(golden_dir, exist_ok=True)
+    for filename, snapshot in snapshots(topics, workers, pdf_dir):
+        if isinstance(snapshot, str):
+            failures[filename] = [snapshot]
+            continue
+        if update:
+            with open(golden_path(golden_dir, filename), 'w', encoding='utf-8') as f:
+                f.write(format_snapshot(snapshot))
+            print(f"✓ Recorded: {filename} ({len(snapshot['pages'])} pages)")
+            continue
+        golden = load_golden(golden_dir, filename)
+        if golden is None:
+            failures[filename] = ["no golden snapshot (record one with --update)"]
+        else:
+            differences = pdf_snapshot.diff_snapshots(golden, snapshot)
+            if differences:
+                failures[filename] = differences
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the rendered topics with golden page snapshots")
+    parser.add_argument('--golden-dir', default=GOLDEN_DIR, help="Directory of golden snapshots")
+    parser.add_argument('--pdf-dir', default=None,
+                        help="Check the PDFs of an existing build instead of rendering the topics")
+    parser.add_argument('--update', action='store_true', help="Record new golden snapshots")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: one per CPU core)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    failures = check(golden_dir=args.golden_dir, workers=args.workers, pdf_dir=args.pdf_dir, update=args.update)
+    elapsed = time.perf_counter() - start
+    for filename in sorted(failures):
+        print(f"✗ {filename}")
+        for line in failures[filename]:
+            print(f"    {line}")
+    if args.update:
+        print(f"✓ Recorded {len(AWS_TOPICS) - len(failures)} snapshots in {args.golden_dir}/ ({elapsed:.1f}s)")
+        return failures
+    if failures:
+        raise SystemExit(f"{len(failures)} of {len(AWS_TOPICS)} documents differ from the golden snapshots")
+    print(f"✓ All {len(AWS_TOPICS)} documents match the golden snapshots ({elapsed:.1f}s)")
+    return failures
+
+if __name__ == "__main__":
+    main()
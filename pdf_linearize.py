@@ -0,0 +1,432 @@
+"""
+PDF linearization (Fast Web View)
+Reorders a finished PDF so the first page, its resources and the hint tables
+come first, letting viewers render page one before the download completes
+(PDF 32000-1:2008, Annex F)
+"""
+
+import zlib
+
+from pdf_objects import (Name, Ref, Stream, PDFParseError, parse_pdf, parse_object,
+                         references, replace_references, serialize, serialize_object,
+                         decode_stream, object_offsets, read_xref)
+
+class BitWriter:
+    """Packs unsigned integers MSB-first, as the hint tables require"""
+    def __init__(self):
+        self.data = bytearray()
+        self.acc = 0
+        self.nbits = 0
+
+    def write(self, value, bits):
+        if bits == 0:
+            return
+        if value < 0 or value >= 1 << bits:
+            raise ValueError(f"{value} does not fit in {bits} bits")
+        self.acc = (self.acc << bits) | value
+        self.nbits += bits
+        while self.nbits >= 8:
+            self.nbits -= 8
+            self.data.append((self.acc >> self.nbits) & 0xFF)
+        self.acc &= (1 << self.nbits) - 1
+
+    def flush(self):
+        """Pad to a byte boundary; every hint table item group starts on one"""
+        if self.nbits:
+            self.write(0, 8 - self.nbits)
+
+class BitReader:
+    def __init__(self, data, pos=0):
+        self.data = data
+        self.bit = pos * 8
+
+    def read(self, bits):
+        value = 0
+        for _ in range(bits):
+            byte = self.data[self.bit // 8]
+            value = (value << 1) | ((byte >> (7 - self.bit % 8)) & 1)
+            self.bit += 1
+        return value
+
+    def align(self):
+        self.bit = (self.bit + 7) // 8 * 8
+
+    @property
+    def pos(self):
+        return self.bit // 8
+
+def _page_closure(pdf, page_ref):
+    """Object numbers a page needs, without following /Parent or other pages"""
+    found = [page_ref.num]
+    seen = {page_ref.num}
+    pending = [ref for key, ref in pdf.objects[page_ref.num].items() if key != 'Parent']
+    stack = list(references(pending))
+    while stack:
+        ref = stack.pop()
+        if ref.num in seen or ref.num not in pdf.objects:
+            continue
+        obj = pdf.objects[ref.num]
+        if isinstance(obj, dict) and obj.get(Name('Type')) in ('Page', 'Pages'):
+            continue
+        seen.add(ref.num)
+        found.append(ref.num)
+        stack.extend(references(obj))
+    return found
+
+def _outline_objects(pdf, catalog):
+    """Outline dictionary first, then every outline item; pages are not followed"""
+    outlines = catalog.get(Name('Outlines'))
+    if not isinstance(outlines, Ref) or outlines.num not in pdf.objects:
+        return []
+    found = [outlines.num]
+    seen = {outlines.num}
+    stack = list(references(pdf.objects[outlines.num]))
+    while stack:
+        ref = stack.pop()
+        if ref.num in seen or ref.num not in pdf.objects:
+            continue
+        obj = pdf.objects[ref.num]
+        if isinstance(obj, dict) and obj.get(Name('Type')) in ('Page', 'Pages', 'Catalog'):
+            continue
+        seen.add(ref.num)
+        found.append(ref.num)
+        stack.extend(references(obj))
+    return found[:1] + sorted(found[1:])
+
+def _bits(value):
+    return max(value, 0).bit_length()
+
+def _page_offset_hints(pages, shared_index):
+    """Page offset hint table (F.4.1); pages is a list of dicts with offset/length/objects/content"""
+    writer = BitWriter()
+    nobjects = [p['objects'] for p in pages]
+    lengths = [p['length'] for p in pages]
+    content_offsets = [p['content'][0] for p in pages]
+    content_lengths = [p['content'][1] for p in pages]
+    shared_refs = [[shared_index[num] for num in p['shared']] for p in pages]
+
+    min_objects, min_length = min(nobjects), min(lengths)
+    min_content_offset, min_content_length = min(content_offsets), min(content_lengths)
+    bits_objects = _bits(max(nobjects) - min_objects)
+    bits_length = _bits(max(lengths) - min_length)
+    bits_content_offset = _bits(max(content_offsets) - min_content_offset)
+    bits_content_length = _bits(max(content_lengths) - min_content_length)
+    bits_nshared = _bits(max(len(refs) for refs in shared_refs))
+    bits_shared_id = _bits(max([i for refs in shared_refs for i in refs], default=0))
+
+    for value, bits in ((min_objects, 32), (pages[0]['offset'], 32), (bits_objects, 16),
+                        (min_length, 32), (bits_length, 16), (min_content_offset, 32),
+                        (bits_content_offset, 16), (min_content_length, 32),
+                        (bits_content_length, 16), (bits_nshared, 16), (bits_shared_id, 16),
+                        (0, 16), (1, 16)):
+        writer.write(value, bits)
+
+    for values, least, bits in ((nobjects, min_objects, bits_objects),
+                                (lengths, min_length, bits_length),
+                                ([len(refs) for refs in shared_refs], 0, bits_nshared)):
+        for value in values:
+            writer.write(value - least, bits)
+        writer.flush()
+    for refs in shared_refs:
+        for ref in refs:
+            writer.write(ref, bits_shared_id)
+    writer.flush()
+    # Numerators of the fractional position use 0 bits (item 12)
+    for values, least, bits in ((content_offsets, min_content_offset, bits_content_offset),
+                                (content_lengths, min_content_length, bits_content_length)):
+        for value in values:
+            writer.write(value - least, bits)
+        writer.flush()
+    return bytes(writer.data)
+
+def _shared_object_hints(groups, first_page_count, first_shared_num, first_shared_offset):
+    """Shared object hint table (F.4.2); groups are the byte lengths of single-object groups"""
+    writer = BitWriter()
+    min_length = min(groups, default=0)
+    bits_length = _bits(max(groups, default=0) - min_length)
+    for value, bits in ((first_shared_num, 32), (first_shared_offset, 32),
+                        (first_page_count, 32), (len(groups), 32), (0, 16),
+                        (min_length, 32), (bits_length, 16)):
+        writer.write(value, bits)
+    for length in groups:
+        writer.write(length - min_length, bits_length)
+    writer.flush()
+    # No MD5 signatures
+    for _ in groups:
+        writer.write(0, 1)
+    writer.flush()
+    return bytes(writer.data)
+
+def linearize(data):
+    """Return a linearized copy of a (non-linearized) PDF"""
+    pdf = parse_pdf(data)
+    page_refs = pdf.page_refs()
+    if not page_refs:
+        raise PDFParseError("document has no pages")
+    closures = [_page_closure(pdf, ref) for ref in page_refs]
+    users = {}
+    for index, closure in enumerate(closures):
+        for num in closure:
+            users.setdefault(num, set()).add(index)
+
+    root_num = pdf.trailer[Name('Root')].num
+    catalog = pdf.objects[root_num]
+    outlines = [num for num in _outline_objects(pdf, catalog) if num not in users]
+    # Outlines shown on opening belong to the first-page section (F.3.6)
+    outlines_first = bool(outlines) and catalog.get(Name('PageMode')) == 'UseOutlines'
+    first_page = closures[0] + (outlines if outlines_first else [])
+    first_set = set(first_page)
+    other_pages = [[num for num in closure if users[num] == {index}]
+                   for index, closure in enumerate(closures) if index > 0]
+    shared = sorted(num for num, pages in users.items()
+                    if len(pages) > 1 and num not in first_set)
+    placed = first_set | set(shared) | set(outlines) | {root_num}
+    for objects in other_pages:
+        placed.update(objects)
+    # Outlines not needed on opening stay together at the start of the remaining objects
+    remaining = ([] if outlines_first else outlines) + sorted(num for num in pdf.objects if num not in placed)
+
+    # Low numbers for the rest of the file, high numbers for the first-page part
+    low = [num for objects in other_pages for num in objects] + shared + remaining
+    k = len(low)
+    lin_num, hint_num = k + 1, k + 3
+    mapping = {num: i + 1 for i, num in enumerate(low)}
+    mapping[root_num] = k + 2
+    for i, num in enumerate(first_page):
+        mapping[num] = k + 4 + i
+    total = k + 3 + len(first_page)
+
+    def body(num):
+        return serialize_object(mapping[num], replace_references(pdf.objects[num], mapping))
+    trailer = replace_references(pdf.trailer, mapping)
+    root_bytes = body(root_num)
+    first_bytes = [body(num) for num in first_page]
+    page_bytes = [[body(num) for num in objects] for objects in other_pages]
+    shared_bytes = [body(num) for num in shared]
+    remaining_bytes = [body(num) for num in remaining]
+
+    header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+
+    def lin_dict(length, hint_offset, hint_length, end_first, main_xref):
+        values = b'<< /Linearized 1 /L %s /H [ %s %s ] /O %d /E %s /N %d /T %s >>' % (
+            b'%-10d' % length, b'%-10d' % hint_offset, b'%-10d' % hint_length,
+            mapping[page_refs[0].num], b'%-10d' % end_first, len(page_refs), b'%-10d' % main_xref)
+        return b'%d 0 obj\n' % lin_num + values + b'\nendobj\n'
+
+    def first_trailer(offsets, main_xref):
+        lines = [b'xref\n%d %d\n' % (k + 1, total - k)]
+        for num in range(k + 1, total + 1):
+            lines.append(b'%010d 00000 n \n' % offsets.get(num, 0))
+        first = dict(trailer)
+        first[Name('Size')] = total + 1
+        first[Name('Prev')] = main_xref
+        # Pad /Prev so the section length does not depend on its value
+        text = serialize(first).replace(b'/Prev %d' % main_xref, b'/Prev %-10d' % main_xref)
+        return b''.join(lines) + b'trailer\n' + text + b'\nstartxref\n0\n%%EOF\n'
+
+    def layout(hint_bytes):
+        """Offsets of every part for a given hint stream"""
+        offsets = {}
+        pos = len(header)
+        offsets[lin_num] = pos
+        pos += len(lin_dict(0, 0, 0, 0, 0))
+        first_xref = pos
+        pos += len(first_trailer({}, 0))
+        offsets[k + 2] = pos
+        pos += len(root_bytes)
+        hint_offset = pos
+        offsets[hint_num] = pos
+        pos += len(hint_bytes)
+        first_ends = []
+        for num, chunk in zip(first_page, first_bytes):
+            offsets[mapping[num]] = pos
+            pos += len(chunk)
+            first_ends.append(pos)
+        end_first = pos
+        page_spans = []
+        for objects, chunks in zip(other_pages, page_bytes):
+            start = pos
+            for num, chunk in zip(objects, chunks):
+                offsets[mapping[num]] = pos
+                pos += len(chunk)
+            page_spans.append((start, pos))
+        for num, chunk in zip(shared + remaining, shared_bytes + remaining_bytes):
+            offsets[mapping[num]] = pos
+            pos += len(chunk)
+        return offsets, first_xref, hint_offset, end_first, page_spans, pos
+
+    def content_span(index, objects, offsets, start):
+        contents = pdf.objects[objects[0]].get(Name('Contents'))
+        refs = contents if isinstance(contents, list) else [contents]
+        nums = [ref.num for ref in refs if isinstance(ref, Ref) and ref.num in objects]
+        if not nums:
+            return 0, 0
+        lengths = {num: len(chunk) for num, chunk in
+                   zip(objects, first_bytes if index == 0 else page_bytes[index - 1])}
+        first = min(offsets[mapping[num]] for num in nums)
+        last = max(offsets[mapping[num]] + lengths[num] for num in nums)
+        return first - start, last - first
+
+    # Hint tables use offsets computed as if the hint stream were absent
+    offsets, _, _, end_first, page_spans, _ = layout(b'')
+    page1_start = offsets[mapping[first_page[0]]]
+    # Every first-page object gets a shared object entry, shared with later pages or not (F.4.2)
+    shared_index = {num: i for i, num in enumerate(first_page)}
+    shared_index.update({num: len(first_page) + i for i, num in enumerate(shared)})
+    pages = [{'offset': page1_start, 'length': end_first - page1_start,
+              'objects': len(first_page), 'shared': [],
+              'content': content_span(0, first_page, offsets, page1_start)}]
+    for index, (objects, (start, end)) in enumerate(zip(other_pages, page_spans), 1):
+        pages.append({'offset': start, 'length': end - start, 'objects': len(objects),
+                      'shared': [num for num in closures[index] if len(users[num]) > 1],
+                      'content': content_span(index, objects, offsets, start)})
+    page_table = _page_offset_hints(pages, shared_index)
+    first_lengths = dict(zip(first_page, map(len, first_bytes)))
+    groups = [first_lengths[num] for num in first_page] + [len(chunk) for chunk in shared_bytes]
+    shared_table = _shared_object_hints(
+        groups, len(first_page),
+        mapping[shared[0]] if shared else 0,
+        offsets[mapping[shared[0]]] if shared else 0)
+    hint_dict = {Name('S'): len(page_table), Name('Filter'): Name('FlateDecode')}
+    tables = page_table + shared_table
+    if outlines:
+        # Outline hint table (F.4.3): first object, its location, object count, group length
+        lengths = dict(zip(first_page, map(len, first_bytes)))
+        lengths.update(zip(remaining, map(len, remaining_bytes)))
+        start = offsets[mapping[outlines[0]]]
+        end = max(offsets[mapping[num]] + lengths[num] for num in outlines)
+        hint_dict[Name('O')] = len(tables)
+        tables += b''.join(value.to_bytes(4, 'big') for value in
+                           (mapping[outlines[0]], start, len(outlines), end - start))
+    hint_stream = Stream(hint_dict, zlib.compress(tables))
+    hint_bytes = serialize_object(hint_num, hint_stream)
+
+    offsets, first_xref, hint_offset, end_first, _, main_xref = layout(hint_bytes)
+    out = bytearray(header)
+    out += lin_dict(0, 0, 0, 0, 0)
+    out += first_trailer(offsets, main_xref)
+    out += root_bytes + hint_bytes + b''.join(first_bytes)
+    for chunks in page_bytes:
+        out += b''.join(chunks)
+    out += b''.join(shared_bytes) + b''.join(remaining_bytes)
+    assert len(out) == main_xref
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (k + 1)
+    for num in range(1, k + 1):
+        out += b'%010d 00000 n \n' % offsets[num]
+    out += b'trailer\n<< /Size %d >>\nstartxref\n%d\n%%%%EOF\n' % (k + 1, first_xref)
+
+    # Patch the linearization dictionary and first-page xref with the final offsets
+    first_entry = main_xref + len(b'xref\n0 %d\n' % (k + 1)) - 1
+    patched = lin_dict(len(out), hint_offset, len(hint_bytes), end_first, first_entry)
+    out[len(header):len(header) + len(patched)] = patched
+    section = first_trailer(offsets, main_xref)
+    out[first_xref:first_xref + len(section)] = section
+    return bytes(out)
+
+def is_linearized(data):
+    return b'/Linearized' in data[:1024]
+
+def verify_linearization(data):
+    """Check a linearized PDF against its own xref; returns a list of problems (empty if valid)"""
+    problems = []
+    try:
+        header_end = data.index(b'\n', data.index(b'\n') + 1) + 1
+        num, lin = parse_object(data, header_end)
+    except (ValueError, PDFParseError) as exc:
+        return [f"cannot read linearization dictionary: {exc}"]
+    if not isinstance(lin, dict) or lin.get(Name('Linearized')) is None:
+        return ["first object is not a linearization dictionary"]
+
+    pdf = parse_pdf(data)
+    offsets = object_offsets(data)
+    page_refs = pdf.page_refs()
+    if lin.get(Name('L')) != len(data):
+        problems.append(f"/L is {lin.get(Name('L'))}, file is {len(data)} bytes")
+    if lin.get(Name('N')) != len(page_refs):
+        problems.append(f"/N is {lin.get(Name('N'))}, document has {len(page_refs)} pages")
+    if lin.get(Name('O')) != page_refs[0].num:
+        problems.append(f"/O is {lin.get(Name('O'))}, first page is object {page_refs[0].num}")
+    main_xref = data.rindex(b'xref', 0, lin.get(Name('T'), 0) + 1)
+    if data[lin.get(Name('T'), 0) + 1:lin.get(Name('T'), 0) + 21] != b'0000000000 65535 f \n':
+        problems.append("/T does not point at the first main cross-reference entry")
+    first_xref_trailer = read_xref(data, data.index(b'xref', header_end), {})
+    if first_xref_trailer.get(Name('Prev')) != main_xref:
+        problems.append("first-page trailer /Prev does not point at the main cross-reference table")
+
+    hint_offset, hint_length = lin[Name('H')][:2]
+    hint_num, hint = parse_object(data, hint_offset)
+    if not isinstance(hint, Stream):
+        return problems + ["/H does not point at the hint stream"]
+    if offsets.get(hint_num) != hint_offset:
+        problems.append("hint stream offset does not match the cross-reference table")
+    end_first = lin[Name('E')]
+    if not offsets[page_refs[0].num] < end_first <= len(data):
+        problems.append("/E is not after the first page object")
+
+    def adjusted(offset):
+        return offset - hint_length if offset > hint_offset else offset
+
+    # Page offset hint table
+    table = decode_stream(hint)
+    reader = BitReader(table)
+    (min_objects, first_location, bits_objects, min_length, bits_length,
+     min_content_offset, bits_content_offset, min_content_length, bits_content_length,
+     bits_nshared, bits_shared_id, bits_numerator, _) = [
+        reader.read(bits) for bits in (32, 32, 16, 32, 16, 32, 16, 32, 16, 16, 16, 16, 16)]
+    n = len(page_refs)
+    def column(least, bits):
+        values = [least + reader.read(bits) for _ in range(n)]
+        reader.align()
+        return values
+    nobjects = column(min_objects, bits_objects)
+    lengths = column(min_length, bits_length)
+    nshared = column(0, bits_nshared)
+    shared_ids = [[reader.read(bits_shared_id) for _ in range(count)] for count in nshared]
+    reader.align()
+    for count in nshared:
+        for _ in range(count):
+            reader.read(bits_numerator)
+    reader.align()
+    column(min_content_offset, bits_content_offset)
+    column(min_content_length, bits_content_length)
+
+    if first_location != adjusted(offsets[page_refs[0].num]):
+        problems.append("hint table first page location does not match the first page object")
+    if first_location + lengths[0] != adjusted(end_first):
+        problems.append("hint table first page length does not end at /E")
+    position = adjusted(end_first)
+    for index, ref in enumerate(page_refs[1:], 1):
+        if adjusted(offsets[ref.num]) != position:
+            problems.append(f"page {index + 1} does not start where the hint table places it")
+        position += lengths[index]
+    by_offset = sorted(adjusted(offset) for num, offset in offsets.items() if num != hint_num)
+    for index, ref in enumerate(page_refs):
+        start = adjusted(offsets[ref.num])
+        count = sum(1 for offset in by_offset if start <= offset < start + lengths[index])
+        if count != nobjects[index]:
+            problems.append(f"page {index + 1}: hint table lists {nobjects[index]} objects, found {count}")
+
+    # Shared object hint table
+    reader = BitReader(table, hint.dict[Name('S')])
+    (first_shared_num, first_shared_location, first_page_entries, entries,
+     bits_group_objects, min_group_length, bits_group_length) = [
+        reader.read(bits) for bits in (32, 32, 32, 32, 16, 32, 16)]
+    if entries < first_page_entries:
+        problems.append("shared object table has fewer entries than its first-page entries")
+    if any(i >= entries for ids in shared_ids for i in ids):
+        problems.append("page offset table references a missing shared object entry")
+    if entries > first_page_entries:
+        if offsets.get(first_shared_num) is None or \
+                adjusted(offsets[first_shared_num]) != first_shared_location:
+            problems.append("shared objects section location does not match its first object")
+
+    # Outline hint table
+    if Name('O') in hint.dict:
+        reader = BitReader(table, hint.dict[Name('O')])
+        first_outline, outline_location, _, _ = [reader.read(32) for _ in range(4)]
+        outlines = pdf.root.get(Name('Outlines'))
+        if not isinstance(outlines, Ref) or outlines.num != first_outline:
+            problems.append("outline hint table does not start at the outline dictionary")
+        elif adjusted(offsets[first_outline]) != outline_location:
+            problems.append("outline hint table location does not match the outline dictionary")
+    return problems
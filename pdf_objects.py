@@ -0,0 +1,461 @@
+"""
+Minimal PDF object reader/writer
+Parses the classic-xref PDFs ReportLab produces so finished documents can be
+analysed and rewritten without an external PDF library
+"""
+
+import base64
+import re
+import zlib
+
+class Name(str):
+    """PDF name object (/Type)"""
+
+class HexString(bytes):
+    """PDF string written in hex form (<48656c6c6f>)"""
+
+class Ref(tuple):
+    """Indirect object reference (12 0 R)"""
+    def __new__(cls, num, gen=0):
+        return tuple.__new__(cls, (num, gen))
+
+    @property
+    def num(self):
+        return self[0]
+
+    @property
+    def gen(self):
+        return self[1]
+
+class Stream:
+    """Stream object: a dictionary plus its (still encoded) data"""
+    def __init__(self, dictionary, data):
+        self.dict = dictionary
+        self.data = data
+
+class PDFParseError(ValueError):
+    pass
+
+WHITESPACE = b' \t\r\n\f\x00'
+DELIMITERS = b'()<>[]{}/%'
+_TOKEN_END = re.compile(rb'[ \t\r\n\f\x00()<>\[\]{}/%]')
+_NUMBER = re.compile(rb'[+-]?(\d+\.?\d*|\.\d+)')
+_REF = re.compile(rb'\s*(\d+)\s+(\d+)\s+R')
+_OBJ_HEADER = re.compile(rb'(\d+)\s+(\d+)\s+obj')
+_XREF_SUBSECTION = re.compile(rb'(\d+)\s+(\d+)')
+_STRING_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f',
+                   b'(': b'(', b')': b')', b'\\': b'\\'}
+
+class Parser:
+    """Recursive-descent parser for PDF values starting at a byte offset"""
+    def __init__(self, data, pos=0):
+        self.data = data
+        self.pos = pos
+
+    def skip_space(self):
+        data, pos = self.data, self.pos
+        while pos < len(data):
+            c = data[pos:pos + 1]
+            if c in WHITESPACE:
+                pos += 1
+            elif c == b'%':
+                end = data.find(b'\n', pos)
+                pos = len(data) if end < 0 else end + 1
+            else:
+                break
+        self.pos = pos
+
+    def keyword(self):
+        self.skip_space()
+        m = _TOKEN_END.search(self.data, self.pos)
+        end = m.start() if m else len(self.data)
+        return self.data[self.pos:end]
+
+    def value(self):
+        self.skip_space()
+        data, pos = self.data, self.pos
+        c = data[pos:pos + 1]
+        if c == b'/':
+            m = _TOKEN_END.search(data, pos + 1)
+            end = m.start() if m else len(data)
+            self.pos = end
+            raw = data[pos + 1:end]
+            return Name(re.sub(rb'#([0-9A-Fa-f]{2})', lambda x: bytes([int(x.group(1), 16)]), raw).decode('latin-1'))
+        if data.startswith(b'<<', pos):
+            self.pos = pos + 2
+            result = {}
+            while True:
+                self.skip_space()
+                if self.data.startswith(b'>>', self.pos):
+                    self.pos += 2
+                    return result
+                key = self.value()
+                if not isinstance(key, Name):
+                    raise PDFParseError(f"dictionary key expected at offset {self.pos}")
+                result[key] = self.value()
+        if c == b'[':
+            self.pos = pos + 1
+            result = []
+            while True:
+                self.skip_space()
+                if self.data[self.pos:self.pos + 1] == b']':
+                    self.pos += 1
+                    return result
+                result.append(self.value())
+        if c == b'(':
+            return self.literal_string()
+        if c == b'<':
+            end = data.index(b'>', pos)
+            self.pos = end + 1
+            digits = re.sub(rb'\s', b'', data[pos + 1:end])
+            if len(digits) % 2:
+                digits += b'0'
+            return HexString(bytes.fromhex(digits.decode('ascii')))
+        m = _NUMBER.match(data, pos)
+        if m:
+            ref = _REF.match(data, pos)
+            if ref:
+                self.pos = ref.end()
+                return Ref(int(ref.group(1)), int(ref.group(2)))
+            self.pos = m.end()
+            text = m.group(0)
+            return float(text) if b'.' in text else int(text)
+        word = self.keyword()
+        self.pos += len(word)
+        if word == b'true':
+            return True
+        if word == b'false':
+            return False
+        if word == b'null':
+            return None
+        raise PDFParseError(f"unexpected token {word!r} at offset {pos}")
+
+    def literal_string(self):
+        data = self.data
+        pos = self.pos + 1
+        depth = 1
+        out = bytearray()
+        while True:
+            c = data[pos:pos + 1]
+            if not c:
+                raise PDFParseError("unterminated string")
+            if c == b'\\':
+                n = data[pos + 1:pos + 2]
+                if n in _STRING_ESCAPES:
+                    out += _STRING_ESCAPES[n]
+                    pos += 2
+                elif n.isdigit():
+                    m = re.match(rb'[0-7]{1,3}', data[pos + 1:pos + 4])
+                    out.append(int(m.group(0), 8) & 0xFF)
+                    pos += 1 + len(m.group(0))
+                elif n == b'\r':
+                    pos += 3 if data[pos + 2:pos + 3] == b'\n' else 2
+                elif n == b'\n':
+                    pos += 2
+                else:
+                    out += n
+                    pos += 2
+                continue
+            if c == b'(':
+                depth += 1
+            elif c == b')':
+                depth -= 1
+                if depth == 0:
+                    self.pos = pos + 1
+                    return bytes(out)
+            out += c
+            pos += 1
+
+class PDFFile:
+    """Objects, trailer and header of a parsed PDF"""
+    def __init__(self, objects, trailer, header=b'%PDF-1.4'):
+        self.objects = objects
+        self.trailer = trailer
+        self.header = header
+
+    def resolve(self, value):
+        while isinstance(value, Ref):
+            value = self.objects.get(value.num)
+        return value
+
+    @property
+    def root(self):
+        return self.resolve(self.trailer[Name('Root')])
+
+    def page_refs(self):
+        """References of the page objects in reading order"""
+        refs = []
+        def walk(ref):
+            node = self.resolve(ref)
+            if node.get(Name('Type')) == 'Pages':
+                for kid in node[Name('Kids')]:
+                    walk(kid)
+            else:
+                refs.append(ref)
+        walk(self.root[Name('Pages')])
+        return refs
+
+    def next_object_number(self):
+        return max(self.objects) + 1 if self.objects else 1
+
+def read_xref(data, offset, offsets):
+    """Collect object offsets from the xref section at offset; returns its trailer"""
+    parser = Parser(data, offset)
+    if parser.keyword() != b'xref':
+        raise PDFParseError("only classic cross-reference tables are supported")
+    parser.pos += 4
+    while True:
+        parser.skip_space()
+        if data.startswith(b'trailer', parser.pos):
+            parser.pos += 7
+            return parser.value()
+        m = _XREF_SUBSECTION.match(data, parser.pos)
+        start, count = int(m.group(1)), int(m.group(2))
+        parser.pos = m.end()
+        for i in range(count):
+            parser.skip_space()
+            entry = data[parser.pos:parser.pos + 18]
+            parser.pos += 18
+            if entry[17:18] == b'n':
+                offsets.setdefault(start + i, int(entry[:10]))
+
+def parse_object(data, offset):
+    """Parse the indirect object at offset; returns (number, value)"""
+    m = _OBJ_HEADER.match(data, offset)
+    if not m:
+        raise PDFParseError(f"object header expected at offset {offset}")
+    parser = Parser(data, m.end())
+    value = parser.value()
+    parser.skip_space()
+    if data.startswith(b'stream', parser.pos):
+        start = parser.pos + 6
+        if data[start:start + 2] == b'\r\n':
+            start += 2
+        elif data[start:start + 1] in (b'\n', b'\r'):
+            start += 1
+        length = value.get(Name('Length'))
+        if isinstance(length, int) and data.startswith(b'endstream', _skip_eol(data, start + length)):
+            end = start + length
+        else:
+            end = data.index(b'endstream', start)
+            while data[end - 1:end] in (b'\n', b'\r'):
+                end -= 1
+        value = Stream(value, data[start:end])
+    return int(m.group(1)), value
+
+def _skip_eol(data, pos):
+    while data[pos:pos + 1] in (b'\n', b'\r', b' '):
+        pos += 1
+    return pos
+
+def parse_pdf(data):
+    """Parse a complete PDF (following /Prev for incremental updates)"""
+    header = data[:data.index(b'\n')].rstrip()
+    startxref = data.rindex(b'startxref')
+    offset = int(data[startxref + 9:].split()[0])
+    offsets = {}
+    trailer = None
+    while offset is not None:
+        section_trailer = read_xref(data, offset, offsets)
+        trailer = trailer or section_trailer
+        offset = section_trailer.get(Name('Prev'))
+    objects = {}
+    for num, obj_offset in offsets.items():
+        objects[num] = parse_object(data, obj_offset)[1]
+    trailer.pop(Name('Prev'), None)
+    return PDFFile(objects, trailer, header)
+
+def xref_sections(data):
+    """Offsets of the cross-reference sections, newest first, with the object offsets they hold"""
+    startxref = data.rindex(b'startxref')
+    offset = int(data[startxref + 9:].split()[0])
+    offsets = {}
+    sections = []
+    while offset is not None:
+        sections.append(offset)
+        offset = read_xref(data, offset, offsets).get(Name('Prev'))
+    return sections, offsets
+
+def object_offsets(data):
+    """Byte offset of every object in the final cross-reference table"""
+    return xref_sections(data)[1]
+
+def references(value):
+    """Yield every Ref contained in a parsed value"""
+    if isinstance(value, Ref):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from references(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from references(item)
+    elif isinstance(value, Stream):
+        yield from references(value.dict)
+
+def replace_references(value, mapping):
+    """Copy of value with Refs renumbered according to {old number: new number}"""
+    if isinstance(value, Ref):
+        return Ref(mapping[value.num], value.gen) if value.num in mapping else value
+    if isinstance(value, dict):
+        return {key: replace_references(item, mapping) for key, item in value.items()}
+    if isinstance(value, list):
+        return [replace_references(item, mapping) for item in value]
+    if isinstance(value, Stream):
+        return Stream(replace_references(value.dict, mapping), value.data)
+    return value
+
+def deduplicate_streams(pdf):
+    """Point references at one copy of each identical stream; returns the number removed"""
+    seen = {}
+    mapping = {}
+    for num in sorted(pdf.objects):
+        value = pdf.objects[num]
+        if not isinstance(value, Stream):
+            continue
+        header = {key: item for key, item in value.dict.items() if key != 'Length'}
+        key = (serialize(header), value.data)
+        if key in seen:
+            mapping[num] = seen[key]
+        else:
+            seen[key] = num
+    if not mapping:
+        return 0
+    for num in mapping:
+        del pdf.objects[num]
+    for num, value in pdf.objects.items():
+        pdf.objects[num] = replace_references(value, mapping)
+    pdf.trailer = replace_references(pdf.trailer, mapping)
+    return len(mapping)
+
+def size_breakdown(data):
+    """Bytes used by fonts, images, content streams and everything else"""
+    pdf = parse_pdf(data)
+    sections, offsets = xref_sections(data)
+    ends = sorted(list(offsets.values()) + sections + [len(data)])
+    position = {offset: i for i, offset in enumerate(ends)}
+    sizes = {}
+    for num, offset in offsets.items():
+        sizes[num] = ends[position[offset] + 1] - offset
+
+    category = {}
+    def claim(ref, label):
+        # Everything reachable from a font or image belongs to it (descriptors, font files, masks)
+        pending = [ref]
+        while pending:
+            ref = pending.pop()
+            if not isinstance(ref, Ref) or ref.num in category:
+                continue
+            category[ref.num] = label
+            pending.extend(references(pdf.objects.get(ref.num)))
+
+    for page_ref in pdf.page_refs():
+        page = pdf.resolve(page_ref)
+        resources = pdf.resolve(page.get(Name('Resources'), {})) or {}
+        for font in (pdf.resolve(resources.get(Name('Font'), {})) or {}).values():
+            claim(font, 'fonts')
+        for xobject in (pdf.resolve(resources.get(Name('XObject'), {})) or {}).values():
+            obj = pdf.resolve(xobject)
+            if isinstance(obj, Stream) and obj.dict.get(Name('Subtype')) == 'Image':
+                claim(xobject, 'images')
+        contents = page.get(Name('Contents'))
+        for ref in (contents if isinstance(contents, list) else [contents]):
+            if isinstance(ref, Ref):
+                category.setdefault(ref.num, 'content')
+
+    breakdown = {'fonts': 0, 'images': 0, 'content': 0, 'other': 0}
+    for num, size in sizes.items():
+        breakdown[category.get(num, 'other')] += size
+    breakdown['other'] += len(data) - sum(sizes.values())
+    return breakdown
+
+def decode_stream(stream):
+    """Apply the stream's filters in reverse, returning the raw content"""
+    filters = stream.dict.get(Name('Filter'), [])
+    if isinstance(filters, Name):
+        filters = [filters]
+    data = stream.data
+    for name in filters:
+        if name == 'ASCII85Decode':
+            data = data.strip()
+            if not data.endswith(b'~>'):
+                data += b'~>'
+            data = base64.a85decode(data, adobe=True)
+        elif name == 'FlateDecode':
+            data = zlib.decompress(data)
+        else:
+            raise PDFParseError(f"unsupported stream filter {name}")
+    return data
+
+def format_number(value):
+    if isinstance(value, float):
+        text = ('%.6f' % value).rstrip('0').rstrip('.')
+        return text if text not in ('', '-0') else '0'
+    return str(value)
+
+def _escape_name(name):
+    out = []
+    for ch in name.encode('latin-1'):
+        if ch < 33 or ch > 126 or bytes([ch]) in DELIMITERS or ch == 35:
+            out.append('#%02X' % ch)
+        else:
+            out.append(chr(ch))
+    return '/' + ''.join(out)
+
+def serialize(value):
+    """PDF syntax for a parsed value"""
+    if isinstance(value, Name):
+        return _escape_name(value).encode('latin-1')
+    if isinstance(value, Ref):
+        return b'%d %d R' % value
+    if isinstance(value, bool):
+        return b'true' if value else b'false'
+    if value is None:
+        return b'null'
+    if isinstance(value, (int, float)):
+        return format_number(value).encode('ascii')
+    if isinstance(value, HexString):
+        return b'<' + value.hex().encode('ascii') + b'>'
+    if isinstance(value, bytes):
+        escaped = value.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+        escaped = escaped.replace(b'\r', b'\\r')
+        return b'(' + escaped + b')'
+    if isinstance(value, str):
+        return serialize(value.encode('latin-1'))
+    if isinstance(value, dict):
+        items = b' '.join(serialize(Name(k)) + b' ' + serialize(v) for k, v in value.items())
+        return b'<< ' + items + b' >>'
+    if isinstance(value, (list, tuple)):
+        return b'[ ' + b' '.join(serialize(v) for v in value) + b' ]'
+    if isinstance(value, Stream):
+        value.dict[Name('Length')] = len(value.data)
+        return serialize(value.dict) + b'\nstream\n' + value.data + b'\nendstream'
+    raise TypeError(f"cannot serialize {type(value).__name__}")
+
+def serialize_object(num, value, gen=0):
+    return b'%d %d obj\n' % (num, gen) + serialize(value) + b'\nendobj\n'
+
+def xref_table(offsets, size):
+    """Classic cross-reference table for {object number: offset}"""
+    lines = [b'xref\n0 %d\n' % size, b'0000000000 65535 f \n']
+    for num in range(1, size):
+        if num in offsets:
+            lines.append(b'%010d 00000 n \n' % offsets[num])
+        else:
+            lines.append(b'0000000000 00000 f \n')
+    return b''.join(lines)
+
+def write_pdf(pdf, order=None):
+    """Serialize a PDFFile, writing objects in the given order (default: by number)"""
+    out = bytearray(pdf.header + b'\n%\x93\x8c\x8b\x9e\n')
+    offsets = {}
+    for num in (order if order is not None else sorted(pdf.objects)):
+        offsets[num] = len(out)
+        out += serialize_object(num, pdf.objects[num])
+    size = max(pdf.objects) + 1
+    xref_offset = len(out)
+    out += xref_table(offsets, size)
+    trailer = dict(pdf.trailer)
+    trailer[Name('Size')] = size
+    out += b'trailer\n' + serialize(trailer) + b'\nstartxref\n%d\n%%%%EOF\n' % xref_offset
+    return bytes(out)
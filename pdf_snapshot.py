@@ -0,0 +1,299 @@
+"""
+Page snapshots for regression checks
+Interprets each page's content stream (text state, transformation matrices
+and form XObjects) and records the text lines and painted shapes with their
+bounding boxes, so two builds can be compared by what is on the page rather
+than by bytes. Comparisons report differences page by page
+"""
+
+import difflib
+import re
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from pdf_objects import Name, Parser, Stream, decode_stream, parse_pdf
+
+# Coordinates are rounded to this many decimals; boxes closer than TOLERANCE points count as unmoved
+PRECISION = 1
+TOLERANCE = 0.5
+IDENTITY = (1, 0, 0, 1, 0, 0)
+PAINT_OPERATORS = {b'S', b's', b'f', b'F', b'f*', b'B', b'B*', b'b', b'b*'}
+
+_NUMBER = re.compile(rb'[+-]?(\d+\.?\d*|\.\d+)')
+_CMAP_BLOCK = re.compile(rb'begin(bfchar|bfrange)(.*?)end\1', re.S)
+_HEX = re.compile(rb'<([0-9A-Fa-f]*)>')
+
+def _winansi(code):
+    try:
+        char = bytes([code]).decode('cp1252')
+    except UnicodeDecodeError:
+        char = None
+    # WinAnsiEncoding shows a bullet for 0x7F and the codes cp1252 leaves unused
+    return '•' if code > 0o40 and (char is None or code == 0x7F) else char or '\ufffd'
+
+WIN_ANSI = [_winansi(code) for code in range(256)]
+
+def multiply(m, n):
+    """Matrix product m x n of PDF matrices (a, b, c, d, e, f)"""
+    a, b, c, d, e, f = m
+    p, q, r, s, t, u = n
+    return (a * p + b * r, a * q + b * s, c * p + d * r, c * q + d * s,
+            e * p + f * r + t, e * q + f * s + u)
+
+def transform(m, x, y):
+    a, b, c, d, e, f = m
+    return a * x + c * y + e, b * x + d * y + f
+
+def operations(data):
+    """(operator, operands) for every operator in a content stream"""
+    parser = Parser(data)
+    operands = []
+    while True:
+        parser.skip_space()
+        pos = parser.pos
+        if pos >= len(data):
+            return
+        c = data[pos:pos + 1]
+        number = _NUMBER.match(data, pos)
+        if number:
+            parser.pos = number.end()
+            text = number.group(0)
+            operands.append(float(text) if b'.' in text else int(text))
+        elif c in b'/(<[':
+            operands.append(parser.value())
+        else:
+            operator = parser.keyword() or c
+            parser.pos += len(operator)
+            if operator == b'BI':
+                # Inline image: skip the binary data up to EI
+                end = data.find(b'EI', data.find(b'ID', parser.pos))
+                parser.pos = len(data) if end < 0 else end + 2
+            else:
+                yield operator, operands
+            operands = []
+
+def parse_to_unicode(data):
+    """Code -> text mapping from a ToUnicode CMap"""
+    mapping = {}
+    for kind, body in _CMAP_BLOCK.findall(data):
+        values = [bytes.fromhex(value.decode('ascii')) for value in _HEX.findall(body)]
+        if kind == b'bfchar':
+            for code, text in zip(values[::2], values[1::2]):
+                mapping[int.from_bytes(code, 'big')] = text.decode('utf-16-be')
+        else:
+            for low, high, text in zip(values[::3], values[1::3], values[2::3]):
+                start = int.from_bytes(text, 'big')
+                for offset in range(int.from_bytes(high, 'big') - int.from_bytes(low, 'big') + 1):
+                    mapping[int.from_bytes(low, 'big') + offset] = chr(start + offset)
+    return mapping
+
+class Font:
+    """Decoding and glyph widths of one simple (single-byte) font resource"""
+    def __init__(self, pdf, font):
+        self.base_font = str(font.get(Name('BaseFont'), 'Helvetica')).split('+')[-1]
+        self.first_char = font.get(Name('FirstChar'), 0)
+        widths = pdf.resolve(font.get(Name('Widths')))
+        self.widths = [pdf.resolve(width) for width in widths] if widths else None
+        to_unicode = pdf.resolve(font.get(Name('ToUnicode')))
+        self.to_unicode = parse_to_unicode(decode_stream(to_unicode)) if isinstance(to_unicode, Stream) else None
+
+    def decode(self, raw):
+        if self.to_unicode is not None:
+            return "".join(self.to_unicode.get(code, '�') for code in raw)
+        return "".join(WIN_ANSI[code] for code in raw)
+
+    def width(self, raw, text):
+        """Advance of raw codes in text space units per 1000 units of font size"""
+        if self.widths is not None:
+            last = self.first_char + len(self.widths)
+            return sum(self.widths[code - self.first_char] if self.first_char <= code < last else 0
+                       for code in raw)
+        # Base-14 fonts carry no widths in the file
+        return stringWidth(text, self.base_font, 1000)
+
+class PageInterpreter:
+    """Collects text runs and painted shapes from one page"""
+    def __init__(self, pdf):
+        self.pdf = pdf
+        self.fonts = {}
+        self.runs = []
+        self.shapes = []
+
+    def font(self, resources, name):
+        ref = self.pdf.resolve(resources.get(Name('Font'), {})).get(Name(name))
+        key = ref if ref is not None else name
+        if key not in self.fonts:
+            self.fonts[key] = Font(self.pdf, self.pdf.resolve(ref) or {})
+        return self.fonts[key]
+
+    def run(self, data, resources, ctm=IDENTITY):
+        pdf = self.pdf
+        stack = []
+        font = None
+        size = char_spacing = word_spacing = leading = rise = 0
+        scale = 1.0
+        tm = tlm = IDENTITY
+        path = []
+
+        def show(raw):
+            nonlocal tm
+            text = font.decode(raw)
+            advance = (font.width(raw, text) * size / 1000 + char_spacing * len(raw)
+                       + word_spacing * raw.count(32)) * scale
+            self.text_run(text, tm, ctm, size, rise, advance)
+            tm = multiply((1, 0, 0, 1, advance, 0), tm)
+
+        for op, args in operations(data):
+            if op == b'q':
+                stack.append((ctm, font, size, char_spacing, word_spacing, leading, rise, scale))
+            elif op == b'Q':
+                if stack:
+                    ctm, font, size, char_spacing, word_spacing, leading, rise, scale = stack.pop()
+            elif op == b'cm':
+                ctm = multiply(tuple(args), ctm)
+            elif op == b'BT':
+                tm = tlm = IDENTITY
+            elif op == b'Tf':
+                font, size = self.font(resources, args[0]), args[1]
+            elif op == b'Tc':
+                char_spacing = args[0]
+            elif op == b'Tw':
+                word_spacing = args[0]
+            elif op == b'Tz':
+                scale = args[0] / 100
+            elif op == b'TL':
+                leading = args[0]
+            elif op == b'Ts':
+                rise = args[0]
+            elif op in (b'Td', b'TD'):
+                if op == b'TD':
+                    leading = -args[1]
+                tm = tlm = multiply((1, 0, 0, 1, args[0], args[1]), tlm)
+            elif op == b'Tm':
+                tm = tlm = tuple(args)
+            elif op == b'T*':
+                tm = tlm = multiply((1, 0, 0, 1, 0, -leading), tlm)
+            elif op in (b'Tj', b"'", b'"'):
+                if op != b'Tj':
+                    if op == b'"':
+                        word_spacing, char_spacing = args[0], args[1]
+                    tm = tlm = multiply((1, 0, 0, 1, 0, -leading), tlm)
+                if font is not None:
+                    show(args[-1])
+            elif op == b'TJ':
+                for item in args[0] if font is not None else ():
+                    if isinstance(item, bytes):
+                        show(item)
+                    else:
+                        tm = multiply((1, 0, 0, 1, -item / 1000 * size * scale, 0), tm)
+            elif op == b're':
+                x, y, w, h = args
+                path += [transform(ctm, x, y), transform(ctm, x + w, y), transform(ctm, x, y + h),
+                         transform(ctm, x + w, y + h)]
+            elif op in (b'm', b'l'):
+                path.append(transform(ctm, *args))
+            elif op in (b'c', b'v', b'y'):
+                path += [transform(ctm, *args[i:i + 2]) for i in range(0, len(args), 2)]
+            elif op in PAINT_OPERATORS or op == b'n':
+                if op != b'n' and path:
+                    xs, ys = [p[0] for p in path], [p[1] for p in path]
+                    self.shapes.append(box(min(xs), min(ys), max(xs), max(ys)))
+                path = []
+            elif op == b'Do':
+                xobject = pdf.resolve(pdf.resolve(resources.get(Name('XObject'), {})).get(Name(args[0])))
+                if isinstance(xobject, Stream) and xobject.dict.get(Name('Subtype')) == 'Form':
+                    matrix = tuple(xobject.dict.get(Name('Matrix'), IDENTITY))
+                    form_resources = pdf.resolve(xobject.dict.get(Name('Resources'))) or resources
+                    self.run(decode_stream(xobject), form_resources, multiply(matrix, ctm))
+
+    def text_run(self, text, tm, ctm, size, rise, advance):
+        if not text.strip():
+            return
+        m = multiply(tm, ctm)
+        x0, y0 = transform(m, 0, rise)
+        x1, _ = transform(m, advance, rise)
+        self.runs.append((y0, x0, x1, size * m[3], text))
+
+def box(x0, y0, x1, y1):
+    return [round(x0, PRECISION), round(y0, PRECISION), round(x1, PRECISION), round(y1, PRECISION)]
+
+def text_lines(runs):
+    """Join runs sharing a baseline into [x0, y0, x1, y1, text], top to bottom"""
+    lines = []
+    for y, x0, x1, height, text in sorted(runs, key=lambda run: (-round(run[0], PRECISION), run[1])):
+        if lines and abs(lines[-1][1] - y) <= TOLERANCE:
+            line = lines[-1]
+            gap = x0 - line[2]
+            if gap > height * 0.15 and not line[4].endswith(' ') and not text.startswith(' '):
+                text = ' ' + text
+            line[2] = max(line[2], x1)
+            line[3] = max(line[3], y + height)
+            line[4] += text
+        else:
+            lines.append([x0, y, x1, y + height, text])
+    return [box(*line[:4]) + [" ".join(line[4].split())] for line in lines]
+
+def page_resources(pdf, page):
+    """Resources of a page, inherited from the page tree if needed"""
+    while page is not None:
+        if Name('Resources') in page:
+            return pdf.resolve(page[Name('Resources')])
+        page = pdf.resolve(page.get(Name('Parent')))
+    return {}
+
+def snapshot(data):
+    """Per-page text lines and shape boxes of a PDF:
+    {'pages': [{'lines': [[x0, y0, x1, y1, text], ...], 'shapes': [[x0, y0, x1, y1], ...]}, ...]}"""
+    pdf = parse_pdf(data)
+    pages = []
+    for ref in pdf.page_refs():
+        page = pdf.resolve(ref)
+        contents = pdf.resolve(page.get(Name('Contents')))
+        streams = contents if isinstance(contents, list) else [contents] if contents is not None else []
+        interpreter = PageInterpreter(pdf)
+        content = b"\n".join(decode_stream(pdf.resolve(stream)) for stream in streams)
+        interpreter.run(content, page_resources(pdf, page))
+        pages.append({'lines': text_lines(interpreter.runs),
+                      'shapes': sorted(interpreter.shapes, key=lambda s: (-s[3], s[0], -s[1], s[2]))})
+    return {'pages': pages}
+
+def moved(old, new):
+    """Largest coordinate difference between two boxes"""
+    return max(abs(a - b) for a, b in zip(old[:4], new[:4]))
+
+def diff_page(old, new):
+    """Difference lines for one page; empty when it matches"""
+    out = []
+    old_text = [line[4] for line in old['lines']]
+    new_text = [line[4] for line in new['lines']]
+    if old_text != new_text:
+        for line in difflib.unified_diff(old_text, new_text, lineterm='', n=1):
+            if not line.startswith(('---', '+++')):
+                out.append(line)
+    else:
+        shifts = [(moved(a, b), a[4]) for a, b in zip(old['lines'], new['lines']) if moved(a, b) > TOLERANCE]
+        if shifts:
+            distance, text = max(shifts)
+            out.append(f"{len(shifts)} text line(s) moved, up to {distance:.1f}pt ({text[:50]!r})")
+    if len(old['shapes']) != len(new['shapes']):
+        out.append(f"{len(new['shapes'])} shapes (golden {len(old['shapes'])})")
+    else:
+        shifts = [moved(a, b) for a, b in zip(old['shapes'], new['shapes']) if moved(a, b) > TOLERANCE]
+        if shifts:
+            out.append(f"{len(shifts)} shape(s) moved or resized, up to {max(shifts):.1f}pt")
+    return out
+
+def diff_snapshots(old, new):
+    """Page-level differences between a golden snapshot and a new one; empty when they match"""
+    out = []
+    old_pages, new_pages = old['pages'], new['pages']
+    if len(old_pages) != len(new_pages):
+        out.append(f"{len(new_pages)} pages (golden {len(old_pages)})")
+    for number in range(max(len(old_pages), len(new_pages))):
+        empty = {'lines': [], 'shapes': []}
+        page = diff_page(old_pages[number] if number < len(old_pages) else empty,
+                         new_pages[number] if number < len(new_pages) else empty)
+        if page:
+            out.append(f"page {number + 1}:")
+            out += ["  " + line for line in page]
+    return out
@@ -0,0 +1,134 @@
+"""
+Per-recipient overlay stamping
+Appends a small incremental update to an already rendered PDF: a diagonal
+watermark under each page and a "Prepared for" line in the header bar.
+The base document is parsed once; each copy only formats two short content
+streams and a cross-reference section
+"""
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from pdf_objects import Name, Ref, Stream, parse_pdf, serialize, serialize_object
+
+STAMP_FONT = 'Helvetica'
+STAMP_FONT_RESOURCE = 'FStamp'
+
+def undrawable(text):
+    """Characters of text that the WinAnsi-encoded stamp font cannot draw, in order"""
+    return [ch for ch in dict.fromkeys(text) if not ch.encode('cp1252', errors='ignore')]
+
+def pdf_text(text):
+    """PDF literal string for text drawn in a WinAnsi-encoded base font"""
+    missing = undrawable(text)
+    if missing:
+        raise ValueError(f"{text!r}: {''.join(missing)!r} cannot be drawn in the {STAMP_FONT} stamp font")
+    raw = text.encode('cp1252')
+    return b'(' + raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+class OverlayStamper:
+    """Stamps recipient overlays onto the pages of one rendered base document"""
+    def __init__(self, base, watermark_size=40, header_size=9, header_margin=72):
+        self.base = base if base.endswith(b'\n') else base + b'\n'
+        self.watermark_size = watermark_size
+        self.header_size = header_size
+        self.header_margin = header_margin
+
+        pdf = parse_pdf(base)
+        startxref = base.rindex(b'startxref')
+        self.prev_xref = int(base[startxref + 9:].split()[0])
+        next_num = pdf.next_object_number()
+        page_refs = pdf.page_refs()
+        if len({tuple(self._media_box(pdf, ref)) for ref in page_refs}) != 1:
+            raise ValueError("stamping expects every page to share one page size")
+        self.width, self.height = self._media_box(pdf, page_refs[0])[2:4]
+
+        # Objects shared by every copy: the stamp font, merged font dictionaries, page dicts
+        fixed = {}
+        font_num = next_num
+        fixed[font_num] = {Name('Type'): Name('Font'), Name('Subtype'): Name('Type1'),
+                           Name('BaseFont'): Name(STAMP_FONT), Name('Encoding'): Name('WinAnsiEncoding')}
+        next_num += 1
+        self.pre_num, self.post_num = next_num, next_num + 1
+        next_num += 2
+        merged_fonts = {}
+        for ref in page_refs:
+            page = dict(pdf.objects[ref.num])
+            resources = dict(pdf.resolve(page.get(Name('Resources'), {})) or {})
+            font_ref = resources.get(Name('Font'))
+            key = font_ref if isinstance(font_ref, Ref) else None
+            if key not in merged_fonts or key is None:
+                fonts = dict(pdf.resolve(font_ref) or {})
+                fonts[Name(STAMP_FONT_RESOURCE)] = Ref(font_num)
+                fixed[next_num] = fonts
+                merged_fonts[key] = Ref(next_num)
+                next_num += 1
+            resources[Name('Font')] = merged_fonts[key]
+            page[Name('Resources')] = resources
+            contents = page.get(Name('Contents'))
+            contents = contents if isinstance(contents, list) else [contents] if contents else []
+            page[Name('Contents')] = [Ref(self.pre_num)] + contents + [Ref(self.post_num)]
+            fixed[ref.num] = page
+        self.size = next_num
+
+        self.trailer = {key: value for key, value in pdf.trailer.items() if key != 'Prev'}
+        self.trailer[Name('Size')] = self.size
+        self.trailer[Name('Prev')] = self.prev_xref
+
+        # Serialize the fixed part once; its xref entries never change
+        tail = bytearray()
+        self.fixed_offsets = {}
+        for num in sorted(fixed):
+            self.fixed_offsets[num] = len(self.base) + len(tail)
+            tail += serialize_object(num, fixed[num])
+        self.fixed_tail = bytes(tail)
+        self.pre_offset = len(self.base) + len(self.fixed_tail)
+        self.trailer_bytes = b'trailer\n' + serialize(self.trailer) + b'\nstartxref\n'
+
+    @staticmethod
+    def _media_box(pdf, ref):
+        node = pdf.resolve(ref)
+        while node is not None:
+            if Name('MediaBox') in node:
+                return [float(v) for v in node[Name('MediaBox')]]
+            node = pdf.resolve(node.get(Name('Parent')))
+        return [0, 0, 612, 792]
+
+    def overlay_streams(self, name, recipient_id):
+        """Content drawn under (watermark) and over (header line) every page"""
+        label = f"{name} - {recipient_id}" if recipient_id else name
+        size = self.watermark_size
+        width = stringWidth(label, STAMP_FONT, size)
+        # Shrink long names so the diagonal fits the page
+        diagonal = (self.width ** 2 + self.height ** 2) ** 0.5 * 0.8
+        if width > diagonal:
+            size = size * diagonal / width
+            width = diagonal
+        c = 0.70710678
+        x = self.width / 2 - c * width / 2 + c * size / 3
+        y = self.height / 2 - c * width / 2 - c * size / 3
+        pre = (b'q 0.9 0.9 0.9 rg BT /%s %.2f Tf %.5f %.5f %.5f %.5f %.2f %.2f Tm %s Tj ET Q q\n'
+               % (STAMP_FONT_RESOURCE.encode(), size, c, c, -c, c, x, y, pdf_text(label)))
+
+        header = f"Prepared for {label}"
+        header_x = self.width - self.header_margin - stringWidth(header, STAMP_FONT, self.header_size)
+        header_y = self.height - 0.5 * 72 / 2 - self.header_size / 3
+        post = (b'Q q 1 1 1 rg BT /%s %.2f Tf %.2f %.2f Td %s Tj ET Q\n'
+                % (STAMP_FONT_RESOURCE.encode(), self.header_size, header_x, header_y, pdf_text(header)))
+        return pre, post
+
+    def stamp(self, name, recipient_id=''):
+        """Bytes of the base document personalised for one recipient"""
+        pre, post = self.overlay_streams(name, recipient_id)
+        pre_obj = serialize_object(self.pre_num, Stream({}, pre))
+        post_obj = serialize_object(self.post_num, Stream({}, post))
+        post_offset = self.pre_offset + len(pre_obj)
+        xref_offset = post_offset + len(post_obj)
+
+        offsets = dict(self.fixed_offsets)
+        offsets[self.pre_num] = self.pre_offset
+        offsets[self.post_num] = post_offset
+        xref = [b'xref\n0 1\n0000000000 65535 f \n']
+        for num in sorted(offsets):
+            xref.append(b'%d 1\n%010d 00000 n \n' % (num, offsets[num]))
+        return b''.join([self.base, self.fixed_tail, pre_obj, post_obj, *xref,
+                         self.trailer_bytes, b'%d\n%%%%EOF\n' % xref_offset])
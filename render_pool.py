@@ -0,0 +1,204 @@
+"""
+Warm render worker pool
+Workers are forked from a server process that has already imported ReportLab
+and the generator. Each worker then builds its styles, loads the font
+metrics and lays out a throwaway page once, so every job it runs afterwards
+only pays for its own layout
+"""
+
+import contextlib
+import importlib
+import io
+import itertools
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from reportlab.pdfbase import pdfmetrics
+
+PRELOAD_MODULES = ('reportlab.platypus', 'reportlab.lib.styles', 'reportlab.pdfbase.pdfmetrics',
+                   'reportlab.platypus.paraparser', 'generate_aws_pdfs')
+
+# Exercises every paragraph style, inline markup, the box table and the page chrome
+WARMUP_SECTIONS = [{
+    'subtitle': 'Warm-up',
+    'text': 'Warm up the <b>layout</b> path &amp; <i>inline</i> markup.',
+    'bullets': ['<b>Term:</b> definition'],
+    'box': '<b>Key Takeaway:</b> warm workers only pay for layout.',
+}]
+
+# The generator owned by this worker process
+_generator = None
+
+def preload(modules=PRELOAD_MODULES):
+    for name in modules:
+        importlib.import_module(name)
+
+def warm_worker(options):
+    """Pool initializer: create the worker's generator and warm styles, fonts and layout"""
+    global _generator
+    from generate_aws_pdfs import PDFGenerator, rl_settings
+    _generator = PDFGenerator(**options)
+    _generator.styles = _generator.create_custom_styles()
+    for font in (_generator.font_regular, _generator.font_bold):
+        pdfmetrics.stringWidth("Warm-up", font, 10)
+
+    buffer = io.BytesIO()
+    doc = _generator.new_document(buffer, 'warmup.pdf', 'Warm-up', WARMUP_SECTIONS)
+    story, _ = _generator.topic_story('Warm-up', WARMUP_SECTIONS, doc.width)
+    decorator = _generator.add_draft_page_number if _generator.draft else _generator.add_header_footer
+    with rl_settings(useA85=1 if _generator.page_compression == 'ascii85' else 0):
+        doc.build(story, onFirstPage=decorator, onLaterPages=decorator)
+
+def render_job(job):
+    """Render one (filename, title, sections[, parsed markup]) job; a failure is reported, not raised.
+
+    Returns (filename, manifest entry or None, seconds, printed output, metrics event,
+    staged (temporary path, final path, sha256) outputs for the parent to publish in batch mode)."""
+    filename, title, content_sections, *parsed = job
+    if parsed:
+        # Markup the parent already parsed during validation
+        _generator.parsed = parsed[0]
+    log = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(log):
+        _generator.build_isolated(filename, _generator.create_pdf, title, content_sections)
+    staged, _generator.staged = _generator.staged, []
+    return (filename, _generator.manifest.get(filename), time.perf_counter() - start, log.getvalue(),
+            _generator.last_event, staged)
+
+def lost_job(job, error):
+    """render_job result for a job whose worker process died"""
+    filename = job[0]
+    event = {'event': 'document', 'file': filename, 'result': 'failed', 'seconds': 0.0, 'error': repr(error)}
+    return filename, None, 0.0, f"✗ Failed: {filename}: worker process died\n", event, []
+
+class RenderPool:
+    """Pre-warmed worker processes rendering with PDFGenerator(**options)"""
+    def __init__(self, processes=None, start_method=None, preload_modules=PRELOAD_MODULES, **options):
+        methods = multiprocessing.get_all_start_methods()
+        if start_method is None:
+            start_method = 'forkserver' if 'forkserver' in methods else 'spawn'
+        context = multiprocessing.get_context(start_method)
+        if start_method == 'forkserver':
+            context.set_forkserver_preload(list(preload_modules))
+        elif start_method == 'fork':
+            preload(preload_modules)
+        self.processes = processes or os.cpu_count() or 1
+        self.context = context
+        self.options = options
+        self.executor = self.start()
+
+    def start(self):
+        return ProcessPoolExecutor(self.processes, mp_context=self.context,
+                                   initializer=warm_worker, initargs=(self.options,))
+
+    def restart(self):
+        self.executor.shutdown(wait=False)
+        self.executor = self.start()
+
+    def submit(self, function, item):
+        try:
+            return self.executor.submit(function, item)
+        except BrokenProcessPool:
+            # A worker died while idle; jobs still in flight are retried when they fail
+            self.restart()
+            return self.executor.submit(function, item)
+
+    def render(self, jobs):
+        """Results of render_job in completion order; a job lost with its worker is reported as failed"""
+        return self.map(render_job, jobs, lost=lost_job)
+
+    def map(self, function, items, lost=None):
+        """Results of function(item) in completion order; function may call render_job.
+
+        When a worker process dies, the pool is restarted and the jobs that were in flight
+        are retried one at a time, which singles out the job that killed it: its result is
+        lost(item, error), or with lost=None the BrokenProcessPool is raised."""
+        items = iter(items)
+        running, retry = {}, []
+        while True:
+            if retry:
+                if not running:
+                    item = retry.pop(0)
+                    running[self.submit(function, item)] = item
+            else:
+                # A few jobs queued per worker keeps them busy without submitting the whole catalog
+                for item in itertools.islice(items, 2 * self.processes - len(running)):
+                    running[self.submit(function, item)] = item
+            if not running:
+                return
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            if any(isinstance(future.exception(), BrokenProcessPool) for future in done):
+                # Every other job in flight fails with it
+                done, _ = wait(running)
+                broken = [future for future in done if isinstance(future.exception(), BrokenProcessPool)]
+                if len(running) == 1:
+                    if lost is None:
+                        raise broken[0].exception()
+                    yield lost(running.pop(broken[0]), broken[0].exception())
+                else:
+                    retry += [running.pop(future) for future in broken]
+                self.restart()
+            for future in done:
+                if future in running:
+                    yield future.result()
+                    del running[future]
+
+    def render_one(self, job):
+        return self.executor.submit(render_job, job).result()
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def cold_render_job(job, options):
+    """A job in a fresh interpreter: imports, styles and fonts are loaded from scratch"""
+    start = time.perf_counter()
+    from generate_aws_pdfs import PDFGenerator
+    generator = PDFGenerator(**options)
+    with contextlib.redirect_stdout(io.StringIO()):
+        generator.create_pdf(*job)
+    return time.perf_counter() - start
+
+def benchmark_pool(jobs=16):
+    """Per-job latency of a fresh interpreter per job against a warm pool"""
+    from generate_aws_pdfs import AWS_TOPICS
+    topics = [AWS_TOPICS[i % len(AWS_TOPICS)] for i in range(jobs)]
+    with tempfile.TemporaryDirectory() as tmp:
+        options = {'output_dir': os.path.join(tmp, 'out'), 'cache_dir': None}
+
+        cold = []
+        with multiprocessing.get_context('spawn').Pool(1, maxtasksperchild=1) as pool:
+            for topic in topics:
+                start = time.perf_counter()
+                pool.apply(cold_render_job, (topic, options))
+                cold.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with RenderPool(1, **options) as pool:
+            # The first job waits for the worker's warm-up
+            pool.render_one(topics[0])
+            startup = time.perf_counter() - start
+            warm, layout = [], []
+            for topic in topics:
+                start = time.perf_counter()
+                _, _, seconds, _, _, _ = pool.render_one(topic)
+                warm.append(time.perf_counter() - start)
+                layout.append(seconds)
+
+    print(f"Cold worker per job (spawn):  median {statistics.median(cold) * 1000:7.1f} ms/job")
+    print(f"Warm pool (forkserver):       median {statistics.median(warm) * 1000:7.1f} ms/job "
+          f"(one-off start-up {startup * 1000:.0f} ms)")
+    print(f"  of which layout and writing: median {statistics.median(layout) * 1000:7.1f} ms/job")
+    print(f"Speed-up per job: {statistics.median(cold) / statistics.median(warm):.1f}x")
+    return cold, warm
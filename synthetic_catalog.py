@@ -0,0 +1,172 @@
+"""
+Synthetic Catalog Generator
+Seeded generator of topic catalogs in the content_sections schema, for
+scale and stress testing. Words are drawn from the real guides so line
+breaking and pagination behave like real content. A catalog can be built
+directly or written as JSON for generate_aws_pdfs.py --catalog
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import re
+import tempfile
+import time
+
+import generate_aws_pdfs
+from generate_aws_pdfs import AWS_TOPICS, TAG, write_catalog
+
+WORD = re.compile(r"[A-Za-z][A-Za-z0-9-]*")
+INLINE_TAGS = ('b', 'i')
+SCALE_SIZES = (10, 100, 1000, 10000)
+
+def vocabulary(topics=AWS_TOPICS):
+    """Distinct words of the given topics, in a fixed order"""
+    words = set()
+    for _, title, sections in topics:
+        texts = [title]
+        for section in sections:
+            texts += [section.get('subtitle', ''), section.get('text', ''), section.get('box', '')]
+            texts += section.get('bullets', [])
+        for text in texts:
+            words.update(WORD.findall(TAG.sub(' ', text).replace('&amp;', ' ')))
+    return sorted(words)
+
+def count_range(text):
+    """'3-6' -> (3, 6); '4' -> (4, 4)"""
+    low, _, high = text.partition('-')
+    return int(low), int(high or low)
+
+class CatalogGenerator:
+    """Random topics from a seed; each count is a (minimum, maximum) range.
+
+    Topic n depends only on the seed, the settings and n, so a larger catalog
+    starts with the topics of a smaller one."""
+    def __init__(self, seed=0, sections=(3, 6), bullets=(3, 6), bullet_words=(6, 16), text_words=(30, 90),
+                 markup_density=0.05, box_frequency=0.3, term_bullets=0.5):
+        self.seed = seed
+        self.sections = sections
+        self.bullets = bullets
+        self.bullet_words = bullet_words
+        self.text_words = text_words
+        # Fraction of words wrapped in <b>/<i>, of sections with a takeaway box, of '<b>Term:</b>' bullets
+        self.markup_density = markup_density
+        self.box_frequency = box_frequency
+        self.term_bullets = term_bullets
+        self.words = vocabulary()
+
+    def phrase(self, rng, count):
+        """count words in title case, without markup"""
+        return " ".join(rng.choice(self.words).capitalize() for _ in range(count))
+
+    def prose(self, rng, count):
+        """count words as sentences, with inline markup at the configured density"""
+        words = []
+        while len(words) < count:
+            sentence = [rng.choice(self.words) for _ in range(min(rng.randint(8, 20), count - len(words)))]
+            sentence[0] = sentence[0].capitalize()
+            sentence[-1] += "."
+            words += sentence
+        for i, word in enumerate(words):
+            if rng.random() < self.markup_density:
+                tag = rng.choice(INLINE_TAGS)
+                words[i] = f"<{tag}>{word}</{tag}>"
+        return " ".join(words)
+
+    def topic(self, number):
+        """(filename, title, sections) of topic number (1-based)"""
+        rng = random.Random(f"{self.seed}:{number}")
+        name = self.phrase(rng, rng.randint(1, 3))
+        sections = []
+        for _ in range(rng.randint(*self.sections)):
+            section = {'subtitle': self.phrase(rng, rng.randint(1, 4))}
+            has_text = rng.random() < 0.7
+            if has_text:
+                section['text'] = self.prose(rng, rng.randint(*self.text_words))
+            if not has_text or rng.random() < 0.7:
+                section['bullets'] = [self.bullet(rng) for _ in range(rng.randint(*self.bullets))]
+            if rng.random() < self.box_frequency:
+                section['box'] = f"<b>Key Takeaway:</b> {self.prose(rng, rng.randint(*self.text_words) // 2 + 1)}"
+            sections.append(section)
+        return f"{number:05d}_{name.replace(' ', '_')}.pdf", f"What is {name}?", sections
+
+    def bullet(self, rng):
+        text = self.prose(rng, rng.randint(*self.bullet_words))
+        if rng.random() < self.term_bullets:
+            return f"<b>{self.phrase(rng, rng.randint(1, 3))}:</b> {text}"
+        return text
+
+    def catalog(self, topics):
+        return [self.topic(number) for number in range(1, topics + 1)]
+
+def build(topics, output_dir, workers=1, quiet=False, cache=True):
+    """Render a catalog through the regular build; returns the PDFGenerator"""
+    argv = ['--output-dir', output_dir, '--workers', str(workers)] + ([] if cache else ['--no-cache'])
+    if not quiet:
+        return generate_aws_pdfs.main(argv, topics=topics)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return generate_aws_pdfs.main(argv, topics=topics)
+
+def scale_test(sizes=SCALE_SIZES, workers=None, **settings):
+    """Generate and build catalogs of growing size, reporting throughput"""
+    workers = workers or os.cpu_count() or 1
+    print(f"Scale test with {workers} worker(s)")
+    print(f"{'Topics':>7} {'Pages':>8} {'MB':>8} {'Generate':>9} {'Build':>9} {'Topics/s':>9} {'Pages/s':>9}")
+    results = []
+    for size in sizes:
+        start = time.perf_counter()
+        topics = CatalogGenerator(**settings).catalog(size)
+        generate_time = time.perf_counter() - start
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            # Cold layout: no cache reads, and synthetic layouts stay out of the shared cache
+            generator = build(topics, tmp, workers, quiet=True, cache=False)
+            build_time = time.perf_counter() - start
+        pages = sum(entry['pages'] for entry in generator.manifest.values())
+        size_mb = sum(entry['bytes'] for entry in generator.manifest.values()) / 1024 / 1024
+        print(f"{size:>7,} {pages:>8,} {size_mb:>8.1f} {generate_time:>8.2f}s {build_time:>8.1f}s "
+              f"{size / build_time:>9.1f} {pages / build_time:>9.1f}")
+        results.append((size, pages, generate_time, build_time))
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic topic catalogs for scale testing")
+    parser.add_argument('--topics', type=int, default=100, help="Number of topics")
+    parser.add_argument('--seed', default='0', help="Seed; the same seed and settings give the same catalog")
+    parser.add_argument('--sections', type=count_range, default=(3, 6), help="Sections per topic, e.g. 3-6")
+    parser.add_argument('--bullets', type=count_range, default=(3, 6), help="Bullets per bullet list")
+    parser.add_argument('--bullet-words', type=count_range, default=(6, 16), help="Words per bullet")
+    parser.add_argument('--text-words', type=count_range, default=(30, 90), help="Words per text paragraph")
+    parser.add_argument('--markup-density', type=float, default=0.05,
+                        help="Fraction of words wrapped in <b>/<i> tags")
+    parser.add_argument('--box-frequency', type=float, default=0.3,
+                        help="Fraction of sections with a key-takeaway box")
+    parser.add_argument('--write', metavar='JSON', help="Write the catalog for generate_aws_pdfs.py --catalog")
+    parser.add_argument('--output-dir', help="Render the catalog into this directory")
+    parser.add_argument('--workers', type=int, default=None, help="Render worker processes (default: one per CPU core)")
+    parser.add_argument('--scale-test', action='store_true',
+                        help="Generate and build catalogs of growing size and report throughput")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SCALE_SIZES), help="Catalog sizes for --scale-test")
+    args = parser.parse_args(argv)
+
+    settings = dict(seed=args.seed, sections=args.sections, bullets=args.bullets, bullet_words=args.bullet_words,
+                    text_words=args.text_words, markup_density=args.markup_density,
+                    box_frequency=args.box_frequency)
+    if args.scale_test:
+        return scale_test(args.sizes, args.workers, **settings)
+
+    topics = CatalogGenerator(**settings).catalog(args.topics)
+    sections = sum(len(section_list) for _, _, section_list in topics)
+    bullets = sum(len(section.get('bullets', [])) for _, _, section_list in topics for section in section_list)
+    print(f"✓ {len(topics):,} topics, {sections:,} sections, {bullets:,} bullets")
+    if args.write:
+        write_catalog(args.write, topics)
+        print(f"✓ Written: {args.write}")
+    if args.output_dir:
+        build(topics, args.output_dir, args.workers or os.cpu_count() or 1)
+    return topics
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Cross-topic links
+Finds mentions of other catalog topics in section text, bullets and boxes
+with an Aho-Corasick keyword automaton (one linear pass per paragraph),
+turns the first mention per section into a link and records the topic
+dependency graph
+"""
+
+import json
+import os
+from collections import deque
+
+LINK_COLOR = '#146EB4'
+GRAPH_NAME = "topic_graph"
+
+# Phrases that refer to each topic; matched case-sensitively on word boundaries
+TOPIC_KEYWORDS = {
+    "01_Continuous_Integration.pdf": ("Continuous Integration",),
+    "02_Continuous_Delivery.pdf": ("Continuous Delivery",),
+    "03_AWS_CloudFormation.pdf": ("CloudFormation",),
+    "04_CloudFront_Origin_Failover.pdf": ("origin failover", "Origin Failover", "origin groups"),
+    "05_Lambda_CloudFront_Edge.pdf": ("Lambda@Edge",),
+    "06_CodePipeline_Best_Practices.pdf": ("CodePipeline",),
+    "07_CD_with_CodePipeline.pdf": ("Continuous Delivery with CodePipeline",),
+    "08_AWS_CodeCommit.pdf": ("CodeCommit",),
+    "09_Elastic_Beanstalk.pdf": ("Elastic Beanstalk",),
+    "10_Amazon_API_Gateway.pdf": ("API Gateway",),
+    "11_AWS_Systems_Manager.pdf": ("Systems Manager",),
+    "12_Amazon_ECS.pdf": ("Amazon ECS", "Elastic Container Service", "ECS"),
+    "13_AWS_X-Ray.pdf": ("X-Ray",),
+    "15_CodeDeploy_Deployments.pdf": ("CodeDeploy",),
+}
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over keyword -> value"""
+    def __init__(self, keywords):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for keyword, value in keywords.items():
+            state = 0
+            for char in keyword:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].append((len(keyword), value))
+
+        # Breadth-first failure links; each state also reports its failure state's matches
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find(self, text):
+        """Non-overlapping leftmost-longest (start, end, value) matches on word boundaries.
+
+        Markup tags and the content of existing <a> links are skipped."""
+        matches = []
+        state = 0
+        i = 0
+        in_link = False
+        while i < len(text):
+            char = text[i]
+            if char == '<':
+                end = text.find('>', i)
+                if end < 0:
+                    break
+                tag = text[i + 1:end].strip().lower()
+                if tag.startswith('a ') or tag == 'a':
+                    in_link = not tag.endswith('/')
+                elif tag == '/a':
+                    in_link = False
+                state = 0
+                i = end + 1
+                continue
+            if in_link:
+                i += 1
+                continue
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for length, value in self.output[state]:
+                start = i + 1 - length
+                if (start == 0 or not text[start - 1].isalnum()) and \
+                        (i + 1 == len(text) or not text[i + 1].isalnum()):
+                    matches.append((start, i + 1, value))
+            i += 1
+
+        selected = []
+        for start, end, value in sorted(matches, key=lambda m: (m[0], m[0] - m[1])):
+            if not selected or start >= selected[-1][1]:
+                selected.append((start, end, value))
+        return selected
+
+def file_target(filename):
+    """Link to another generated PDF in the same directory"""
+    return f"pdf:{filename}"
+
+class TopicLinker:
+    """Links topic mentions across a catalog and records who references whom"""
+    def __init__(self, topics, keywords=TOPIC_KEYWORDS, target=file_target):
+        known = {filename for filename, _, _ in topics}
+        self.automaton = KeywordAutomaton({keyword: filename
+                                           for filename, phrases in keywords.items() if filename in known
+                                           for keyword in phrases})
+        self.target = target
+        self.graph = {filename: {} for filename, _, _ in topics}
+
+    def link_text(self, source, text, linked):
+        """Text with the first mention of each not yet linked topic wrapped in a link"""
+        parts = []
+        last = 0
+        for start, end, filename in self.automaton.find(text):
+            if filename == source:
+                continue
+            references = self.graph[source]
+            references[filename] = references.get(filename, 0) + 1
+            if filename in linked:
+                continue
+            linked.add(filename)
+            parts.append(text[last:start])
+            parts.append(f'<a href="{self.target(filename)}" color="{LINK_COLOR}">{text[start:end]}</a>')
+            last = end
+        parts.append(text[last:])
+        return "".join(parts)
+
+    def link_topics(self, topics):
+        """Catalog copy with cross-topic links in text, bullets and boxes"""
+        linked_topics = []
+        for filename, title, sections in topics:
+            linked_sections = []
+            for section in sections:
+                linked = set()
+                section = dict(section)
+                if 'text' in section:
+                    section['text'] = self.link_text(filename, section['text'], linked)
+                if 'bullets' in section:
+                    section['bullets'] = [self.link_text(filename, bullet, linked) for bullet in section['bullets']]
+                if 'box' in section:
+                    section['box'] = self.link_text(filename, section['box'], linked)
+                linked_sections.append(section)
+            linked_topics.append((filename, title, linked_sections))
+        return linked_topics
+
+def write_graph(graph, topics, output_dir, write_file):
+    """Dependency graph as JSON (filename -> referenced filenames with mention counts) and Graphviz DOT,
+    written with write_file(path, data) so a batch build stages them with its PDFs"""
+    titles = {filename: title for filename, title, _ in topics}
+    data = json.dumps({'topics': titles, 'references': graph}, indent=2, sort_keys=True) + "\n"
+    write_file(os.path.join(output_dir, GRAPH_NAME + ".json"), data.encode())
+    lines = ["digraph topics {", "  rankdir=LR;", "  node [shape=box, style=rounded];"]
+    for filename, title in titles.items():
+        lines.append(f"  {json.dumps(filename)} [label={json.dumps(title)}];")
+    for source, references in graph.items():
+        for filename, count in sorted(references.items()):
+            lines.append(f"  {json.dumps(source)} -> {json.dumps(filename)} [label={count}];")
+    lines.append("}")
+    write_file(os.path.join(output_dir, GRAPH_NAME + ".dot"), ("\n".join(lines) + "\n").encode())